@@ -3,7 +3,7 @@
 
 from PySide6.QtWidgets import QWidget
 from PySide6.QtGui import QPainter, QPen, QColor, QMouseEvent, QPaintEvent, QImage, QBrush, QResizeEvent
-from PySide6.QtCore import Qt, QPoint, QRect, QSize, QEvent
+from PySide6.QtCore import Qt, QPoint, QRect, QSize, QEvent, QTimer
 
 class DrawingCanvas(QWidget):
     """
@@ -11,7 +11,7 @@ class DrawingCanvas(QWidget):
     Поддерживает различные инструменты (кисть, ластик, фигуры)
     и отображает предварительный просмотр размера кисти/ластика.
     """
-    def __init__(self, parent=None, width=800, height=600):
+    def __init__(self, parent=None, width=800, height=600, throttle_hz=0):
         """
         Инициализирует холст для рисования.
 
@@ -19,6 +19,9 @@ class DrawingCanvas(QWidget):
             parent (QWidget, optional): Родительский виджет. Defaults to None.
             width (int, optional): Начальная ширина холста. Defaults to 800.
             height (int, optional): Начальная высота холста. Defaults to 600.
+            throttle_hz (int, optional): Максимальная частота обработки движений мыши при рисовании.
+                Промежуточные события сливаются в одно (берется последняя позиция).
+                0 - обрабатывать каждое событие. Defaults to 0.
         """
         super().__init__(parent)
 
@@ -49,6 +52,15 @@ class DrawingCanvas(QWidget):
         self.show_brush_cursor = False # Показывать ли курсор-кисть
         self.current_mouse_pos = QPoint() # Текущая позиция мыши для курсора-кисти
 
+        # Для ограничения частоты рисования (мыши с высокой частотой опроса)
+        self._pending_point = None # Последняя еще не отрисованная точка
+        self._move_timer = None
+        if throttle_hz > 0:
+            self._move_timer = QTimer(self)
+            self._move_timer.setSingleShot(True)
+            self._move_timer.setInterval(max(1, int(1000 / throttle_hz)))
+            self._move_timer.timeout.connect(self._flush_pending_point)
+
         self.setFixedSize(width, height) # Фиксируем размер виджета под размер изображения
 
     def set_pen_color(self, color: QColor):
@@ -62,6 +74,18 @@ class DrawingCanvas(QWidget):
             self.pen_width = width
             self.update() # Обновляем для перерисовки курсора-кисти, если он видим
 
+    def set_canvas_size(self, width: int, height: int):
+        """
+        Меняет разрешение холста (например, для слоя другого размера).
+        При смене размера рисунок сбрасывается - холст снова прозрачный.
+        """
+        if self.image.width() == width and self.image.height() == height:
+            return
+        self.image = QImage(width, height, QImage.Format.Format_ARGB32_Premultiplied)
+        self.image.fill(Qt.GlobalColor.transparent)
+        self.temp_image = None
+        self.setFixedSize(width, height) # Подгоняем размер виджета под новое изображение
+
     def set_mode(self, mode: str):
         """
         Устанавливает режим рисования.
@@ -115,6 +139,23 @@ class DrawingCanvas(QWidget):
         # Если кнопка нажата и идет рисование
         current_point = event.position().toPoint()
 
+        if self._move_timer is not None:
+            # Копим движение до срабатывания таймера: рисуется только последняя точка
+            self._pending_point = current_point
+            if not self._move_timer.isActive():
+                self._move_timer.start()
+            return
+
+        self._draw_to(current_point)
+
+    def _flush_pending_point(self):
+        """Отрисовывает накопленную за интервал троттлинга точку."""
+        if self._pending_point is not None and self.drawing:
+            self._draw_to(self._pending_point)
+        self._pending_point = None
+
+    def _draw_to(self, current_point: QPoint):
+        """Продолжает текущий штрих (или предпросмотр фигуры) до точки current_point в координатах изображения."""
         if self.mode in ['brush', 'eraser'] and self.image:
             painter = QPainter(self.image)
             pen = QPen()
@@ -149,6 +190,10 @@ class DrawingCanvas(QWidget):
     def mouseReleaseEvent(self, event: QMouseEvent):
         """Обрабатывает отпускание кнопки мыши."""
         if event.button() == Qt.MouseButton.LeftButton and self.drawing:
+            if self._pending_point is not None: # Дорисовываем то, что не успел отрисовать таймер
+                if self._move_timer is not None:
+                    self._move_timer.stop()
+                self._flush_pending_point()
             self.drawing = False
             current_point = event.position().toPoint()
 
@@ -181,7 +226,7 @@ class DrawingCanvas(QWidget):
         """Перерисовывает виджет."""
         painter = QPainter(self)
         
-        # Рисуем основное изображение
+        # Рисуем основное изображение (масштаб отображения задает преобразование вида сцены)
         if self.image:
             painter.drawImage(0, 0, self.image)
 
@@ -1,15 +1,31 @@
 # Файл: app/gradient_utils.py
+import numpy as np
 from PIL import Image
 
 def create_linear_gradient(width, height, start_color, end_color, direction='horizontal'):
-    """Создаёт PIL-изображение с линейным градиентом."""
-    base = Image.new('RGBA', (width, height), start_color)
-    top = Image.new('RGBA', (width, height), end_color)
+    """
+    Создаёт PIL-изображение с линейным градиентом.
+
+    Градиент считается одним векторизованным проходом NumPy: строка (или столбец)
+    цветов вычисляется один раз и растягивается на всё изображение.
+
+    Args:
+        width (int): Ширина изображения.
+        height (int): Высота изображения.
+        start_color (tuple): Начальный цвет (R, G, B, A).
+        end_color (tuple): Конечный цвет (R, G, B, A).
+        direction (str): 'horizontal' (слева направо) или 'vertical' (сверху вниз).
+
+    Returns:
+        PIL.Image.Image: Изображение в режиме RGBA.
+    """
+    start = np.asarray(start_color, dtype=np.float32)
+    end = np.asarray(end_color, dtype=np.float32)
 
     if direction == 'horizontal':
-        mask = Image.linear_gradient('L').resize((width, 1)).resize((width, height))
+        t = np.linspace(0.0, 1.0, width, dtype=np.float32)[None, :, None]
     else:
-        mask = Image.linear_gradient('L').resize((1, height)).resize((width, height))
+        t = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
 
-    base.paste(top, (0, 0), mask)
-    return base
+    ramp = (start * (1.0 - t) + end * t + 0.5).astype(np.uint8)
+    return Image.fromarray(np.broadcast_to(ramp, (height, width, 4)).copy())
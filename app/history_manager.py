@@ -1,80 +1,145 @@
 # Файл: app/history_manager.py
 # Управляет историей действий (Undo/Redo) для каждого слоя.
 
+import zlib
 from collections import defaultdict
 
+import numpy as np
+from PIL import Image
+
+from .image_operations import get_changed_bbox
+
+# Если сжатая XOR-разница больше этой доли от размера изображения, выгоднее хранить снимок
+XOR_DIFF_MAX_RATIO = 0.5
+
 
 class HistoryManager:
-    """Управляет стеками undo/redo для состояний изображений каждого слоя."""
+    """
+    Управляет стеками undo/redo для каждого слоя.
+
+    Каждая запись стека - пара (bbox, data):
+    - bbox = (left, upper, right, lower): data - сжатый zlib XOR пикселей области bbox до и после
+      действия. XOR симметричен, поэтому одна и та же запись и отменяет действие (after ^ diff = before),
+      и повторяет его (before ^ diff = after) - при undo она просто переходит в стек redo.
+    - bbox = None: data - снимок всего изображения (PIL Image). Так хранятся действия, меняющие
+      размер или режим изображения, и те, чья разница сжимается хуже снимка.
 
-    def __init__(self, max_history_depth=20):
+    Изображения слоев не изменяются на месте (каждое действие создает новое), поэтому снимки
+    хранятся без копирования.
+    """
+
+    def __init__(self, max_history_depth=50):
         self.max_depth = max_history_depth
         # Словарь, где ключ - ID слоя, значение - словарь {'undo': [], 'redo': []}
         self.history_stacks = defaultdict(lambda: {'undo': [], 'redo': []})
 
-    def add_state(self, layer_id, image_state_pil, is_initial_state=False):
-        """Добавляет новое состояние изображения для указанного слоя."""
+    def add_change(self, layer_id, before_pil, after_pil, bbox=None, bbox_known=False):
+        """
+        Запоминает действие, которое заменило изображение слоя before_pil на after_pil.
+
+        Args:
+            layer_id: ID слоя.
+            before_pil (PIL.Image.Image): Изображение слоя до действия.
+            after_pil (PIL.Image.Image): Изображение слоя после действия.
+            bbox (tuple, optional): Область (left, upper, right, lower), вне которой изображения
+                заведомо совпадают. Если не задана, находится сравнением изображений.
+            bbox_known (bool, optional): bbox уже найден вызывающим (get_changed_bbox), и None
+                означает, что изображения одинакового размера и режима совпадают - повторно
+                они не сравниваются.
+        """
         if not layer_id: return
 
-        layer_history = self.history_stacks[layer_id]
-
-        # Если это не первое состояние после сброса/создания, добавляем текущее в undo
-        if not is_initial_state and layer_history['undo']:
-            # Проверка, чтобы не добавлять дубликаты подряд (если изображение не изменилось)
-            # Это требует сравнения изображений, что может быть дорого.
-            # Пока упростим и будем добавлять.
-            pass
+        if before_pil.size != after_pil.size or before_pil.mode != after_pil.mode:
+            self._push(layer_id, (None, before_pil))
+            return
+
+        if bbox is None:
+            if bbox_known:
+                return  # Вызывающий уже сравнил изображения: изменений нет
+            bbox = get_changed_bbox(before_pil, after_pil)
+            if bbox is None:
+                return  # Изображение не изменилось - отменять нечего
+
+        diff = np.bitwise_xor(np.asarray(before_pil.crop(bbox)), np.asarray(after_pil.crop(bbox)))
+        data = zlib.compress(diff.tobytes(), 1)  # Уровень 1: быстро, а XOR-разница и так почти из нулей
+        full_size = before_pil.width * before_pil.height * len(before_pil.getbands())
+        if len(data) > full_size * XOR_DIFF_MAX_RATIO:
+            self._push(layer_id, (None, before_pil))
+        else:
+            self._push(layer_id, (bbox, data))
 
-        layer_history['undo'].append(image_state_pil)
+    def _push(self, layer_id, entry):
+        """Кладет запись в стек undo, ограничивая глубину истории и очищая стек redo."""
+        layer_history = self.history_stacks[layer_id]
+        layer_history['undo'].append(entry)
 
         # Ограничиваем глубину истории undo
         while len(layer_history['undo']) > self.max_depth:
             layer_history['undo'].pop(0)  # Удаляем самое старое состояние
 
         # При добавлении нового состояния, очищаем стек redo
-        if not is_initial_state:  # Не очищаем redo, если это самое первое состояние (например, при сбросе)
-            layer_history['redo'].clear()
+        layer_history['redo'].clear()
 
-    def undo(self, layer_id):
-        """Отменяет последнее действие для слоя, возвращает предыдущее состояние изображения."""
-        if not layer_id or not self.can_undo(layer_id):
-            return None
+    def undo(self, layer_id, current_image_pil):
+        """
+        Отменяет последнее действие для слоя.
 
-        layer_history = self.history_stacks[layer_id]
-        # Последний элемент в 'undo' - это текущее состояние.
-        # Нам нужно состояние *перед* ним.
-        # Но наша логика add_state добавляет *текущее* состояние в undo перед изменением.
-        # Значит, при undo, мы берем последнее из undo, кладем его в redo,
-        # и возвращаем ПРЕДПОСЛЕДНЕЕ из undo (если оно есть).
+        Args:
+            layer_id: ID слоя.
+            current_image_pil (PIL.Image.Image): Текущее изображение слоя.
 
-        current_state = layer_history['undo'].pop()  # Извлекаем текущее состояние
-        layer_history['redo'].append(current_state)  # Перемещаем его в redo
+        Returns:
+            tuple: (изображение слоя до действия, измененная область bbox или None, если изменилось
+            все изображение) или (None, None), если отменять нечего.
+        """
+        if not layer_id or not self.can_undo(layer_id):
+            return None, None
 
-        if layer_history['undo']:
-            return layer_history['undo'][-1].copy()  # Возвращаем предыдущее состояние (теперь оно последнее в undo)
-        else:
-            # Если стек undo пуст после извлечения, значит, мы откатились к самому началу.
-            # В этом случае, возможно, нужно вернуть "оригинальное" изображение слоя, если оно хранится.
-            # Или просто сигнализировать, что дальше отменять нечего.
-            # Для текущей логики, если undo пуст, значит, некуда откатываться.
-            # Вернем current_state обратно в undo, т.к. отмена невозможна дальше.
-            layer_history['undo'].append(layer_history['redo'].pop())  # Возвращаем состояние
-            return None
-
-    def redo(self, layer_id):
-        """Повторяет отмененное действие для слоя, возвращает восстановленное состояние изображения."""
+        layer_history = self.history_stacks[layer_id]
+        entry = layer_history['undo'].pop()
+        restored, opposite_entry = self._apply(entry, current_image_pil)
+        layer_history['redo'].append(opposite_entry)  # Для повтора
+        return restored, entry[0]
+
+    def redo(self, layer_id, current_image_pil):
+        """
+        Повторяет отмененное действие для слоя.
+
+        Returns:
+            tuple: (изображение слоя после действия, измененная область bbox или None, если изменилось
+            все изображение) или (None, None), если повторять нечего.
+        """
         if not layer_id or not self.can_redo(layer_id):
-            return None
+            return None, None
 
         layer_history = self.history_stacks[layer_id]
-        redone_state = layer_history['redo'].pop()  # Извлекаем состояние из redo
-        layer_history['undo'].append(redone_state)  # Перемещаем его обратно в undo (как текущее)
-        return redone_state.copy()
+        entry = layer_history['redo'].pop()
+        restored, opposite_entry = self._apply(entry, current_image_pil)
+        layer_history['undo'].append(opposite_entry)  # Для повторной отмены
+        return restored, entry[0]
+
+    @staticmethod
+    def _apply(entry, current_image_pil):
+        """
+        Применяет запись к текущему изображению.
+
+        Returns:
+            tuple: (новое изображение, запись для противоположного стека).
+        """
+        bbox, data = entry
+        if bbox is None:
+            return data, (None, current_image_pil)
+
+        current_patch = np.asarray(current_image_pil.crop(bbox))
+        diff = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(current_patch.shape)
+        restored = current_image_pil.copy()
+        restored_patch = Image.frombytes(current_image_pil.mode, (bbox[2] - bbox[0], bbox[3] - bbox[1]),
+                                         np.bitwise_xor(current_patch, diff).tobytes())
+        restored.paste(restored_patch, bbox[:2])
+        return restored, entry
 
     def can_undo(self, layer_id):
-        # Можно отменить, если в стеке undo БОЛЕЕ ОДНОГО элемента
-        # (первый элемент - это самое начальное состояние, к которому мы откатываемся)
-        return layer_id in self.history_stacks and len(self.history_stacks[layer_id]['undo']) > 1
+        return layer_id in self.history_stacks and bool(self.history_stacks[layer_id]['undo'])
 
     def can_redo(self, layer_id):
         return layer_id in self.history_stacks and bool(self.history_stacks[layer_id]['redo'])
@@ -86,4 +151,4 @@ class HistoryManager:
             self.history_stacks[layer_id]['redo'].clear()
 
     def clear_all_history(self):
-        self.history_stacks.clear()
\ No newline at end of file
+        self.history_stacks.clear()
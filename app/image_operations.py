@@ -1,51 +1,163 @@
 # Файл: app/image_operations.py
 # Содержит функции для выполнения различных операций над изображениями с использованием Pillow.
+# Функции-фильтры не изменяют переданное изображение: результат всегда новый объект Image.
 
-from PIL import Image, ImageEnhance, ImageOps, ImageFilter
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageOps, ImageFilter
+
+# Пул потоков для обработки изображений полосами. NumPy, Pillow и ядро Numba (nogil) отпускают GIL
+# на время тяжелых операций, поэтому полосы одного изображения считаются на разных ядрах параллельно.
+_WORKERS = os.cpu_count() or 1
+_POOL = ThreadPoolExecutor(max_workers=_WORKERS)
+
+
+def map_bands(function, height, band_height):
+    """
+    Вызывает function(upper, lower) для горизонтальных полос [upper, lower) изображения высотой height.
+
+    Полосы обрабатываются в общем пуле потоков (на одноядерной машине - по очереди в текущем потоке),
+    function должна писать только в свою полосу.
+
+    Returns:
+        list: Результаты function для полос сверху вниз.
+    """
+    bands = [(upper, min(upper + band_height, height)) for upper in range(0, height, band_height)]
+    if _WORKERS < 2 or len(bands) < 2:
+        return [function(upper, lower) for upper, lower in bands]
+    return list(_POOL.map(lambda band: function(*band), bands))
 
 
 def apply_grayscale(image_pil):
-    if image_pil: return image_pil.convert("L").convert("RGBA")
+    """Переводит изображение в оттенки серого. RGB остается RGB, у RGBA сохраняется альфа-канал."""
+    if image_pil:
+        gray = image_pil.convert("L")
+        if image_pil.mode == 'RGB':
+            return gray.convert("RGB")
+        if image_pil.mode == 'RGBA':
+            return Image.merge("RGBA", (gray, gray, gray, image_pil.getchannel("A")))
+        return gray.convert("RGBA")
     return None
 
 
+# Матрица сепии: новый (R, G, B) = SEPIA_MATRIX @ старый (R, G, B), с насыщением в 0..255
+SEPIA_MATRIX = (
+    (0.393, 0.769, 0.189),
+    (0.349, 0.686, 0.168),
+    (0.272, 0.534, 0.131),
+)
+
+
+@lru_cache(maxsize=1)
+def _load_sepia_kernel():
+    """
+    Возвращает ядро сепии на Numba или None, если numba не установлена
+    (тогда матрица применяется через Image.convert - тоже в C, но примерно вдвое медленнее).
+    """
+    try:
+        import numba
+    except ImportError:
+        return None
+
+    @numba.njit(nogil=True, fastmath=True, cache=True)
+    def sepia_kernel(src, out, matrix):
+        # Один проход по пикселям: три скалярных произведения, насыщение и копия альфы (если есть)
+        height, width, channels = src.shape
+        for y in range(height):
+            for x in range(width):
+                r, g, b = np.float32(src[y, x, 0]), np.float32(src[y, x, 1]), np.float32(src[y, x, 2])
+                for c in range(3):
+                    value = matrix[c, 0] * r + matrix[c, 1] * g + matrix[c, 2] * b + np.float32(0.5)
+                    out[y, x, c] = np.uint8(min(value, np.float32(255.0)))
+                if channels == 4:
+                    out[y, x, 3] = src[y, x, 3]
+
+    return sepia_kernel
+
+
 def apply_sepia(image_pil):
+    """Применяет эффект сепии. RGB остается RGB, у RGBA сохраняется альфа-канал."""
     if image_pil:
         if image_pil.mode != 'RGB' and image_pil.mode != 'RGBA':
             image_pil = image_pil.convert('RGBA')
 
-        r, g, b, *a = image_pil.split()
+        sepia_kernel = _load_sepia_kernel()
+        if sepia_kernel is not None:
+            src = np.asarray(image_pil)
+            out = np.empty_like(src)
+            matrix = np.asarray(SEPIA_MATRIX, dtype=np.float32)
+            # По полосе строк на поток: полосы не пересекаются и считаются параллельно (ядро отпускает GIL)
+            map_bands(lambda upper, lower: sepia_kernel(src[upper:lower], out[upper:lower], matrix),
+                      image_pil.height, -(-image_pil.height // _WORKERS))
+            return Image.fromarray(out, image_pil.mode)
 
-        r_new = r.point(
-            lambda i: i * 0.393 + g.getdata()[r.getdata().index(i)] * 0.769 + b.getdata()[r.getdata().index(i)] * 0.189)
-        g_new = r.point(
-            lambda i: i * 0.349 + g.getdata()[r.getdata().index(i)] * 0.686 + b.getdata()[r.getdata().index(i)] * 0.168)
-        b_new = r.point(
-            lambda i: i * 0.272 + g.getdata()[r.getdata().index(i)] * 0.534 + b.getdata()[r.getdata().index(i)] * 0.131)
+        # Матричное преобразование Pillow: 12 коэффициентов (по 4 на канал, последний - смещение)
+        matrix = tuple(coefficient for row in SEPIA_MATRIX for coefficient in (*row, 0.0))
+        if image_pil.mode == 'RGB':
+            return image_pil.convert('RGB', matrix)
+        sepia = image_pil.convert('RGB').convert('RGB', matrix)  # Матрицу Pillow применяет только к RGB
+        sepia.putalpha(image_pil.getchannel('A'))
+        return sepia
+    return None
 
-        # Ограничение значений в диапазоне 0-255 (Pillow делает это автоматически при .point, но для ясности)
-        # r_new = r_new.point(lambda i: min(255, int(i)))
-        # g_new = g_new.point(lambda i: min(255, int(i)))
-        # b_new = b_new.point(lambda i: min(255, int(i)))
 
-        if a:  # Если был альфа-канал
-            return Image.merge('RGBA', (r_new, g_new, b_new, a[0]))
-        else:
-            return Image.merge('RGB', (r_new, g_new, b_new)).convert('RGBA')
-    return None
+@lru_cache(maxsize=64)
+def _linear_color_lut(factor, offset, has_alpha=True):
+    """
+    Таблица для Image.point: color * factor + offset для цветовых каналов, альфа (если has_alpha) без изменений.
+    Кэшируется по (factor, offset, has_alpha): повторная регулировка с тем же коэффициентом не пересчитывает таблицу.
+    """
+    levels = np.arange(256, dtype=np.float32)
+    color_lut = np.clip(levels * np.float32(factor) + np.float32(offset + 0.5), 0, 255).astype(np.uint8)
+    if not has_alpha:
+        return np.concatenate((color_lut, color_lut, color_lut)).tolist()
+    alpha_lut = levels.astype(np.uint8)
+    return np.concatenate((color_lut, color_lut, color_lut, alpha_lut)).tolist()
+
+
+def _scale_color(image_pil, factor, offset=0.0):
+    """
+    Линейно преобразует цветовые каналы: color * factor + offset (с насыщением в 0..255).
+    Альфа-канал не меняется; RGB обрабатывается как есть, без перевода в RGBA.
+
+    Формула вычисляется векторно в NumPy один раз для всех 256 уровней канала, а к пикселям
+    таблица применяется через Image.point (C-цикл Pillow без промежуточных float-массивов).
+    """
+    if image_pil.mode == 'RGB':
+        return image_pil.point(_linear_color_lut(factor, offset, has_alpha=False))
+    rgba_image = image_pil if image_pil.mode == 'RGBA' else image_pil.convert('RGBA')
+    return rgba_image.point(_linear_color_lut(factor, offset))
+
+
+def _mean_luminance(image_pil):
+    """
+    Средняя яркость (L = 0.299 R + 0.587 G + 0.114 B) по гистограмме каналов.
+    Среднее линейно, поэтому переводить изображение в режим "L" не нужно.
+    """
+    color_image = image_pil if image_pil.mode in ('RGB', 'RGBA') else image_pil.convert('RGBA')
+    histogram = np.asarray(color_image.histogram(), dtype=np.float64).reshape(-1, 256)
+    channel_means = histogram[:3] @ np.arange(256) / (color_image.width * color_image.height)
+    return float(channel_means @ (0.299, 0.587, 0.114))
 
 
 def adjust_brightness(image_pil, factor):
+    """Яркость (как ImageEnhance.Brightness): смешение с черным, цвет умножается на factor."""
     if image_pil:
-        enhancer = ImageEnhance.Brightness(image_pil)
-        return enhancer.enhance(factor)
+        return _scale_color(image_pil, factor)
     return None
 
 
 def adjust_contrast(image_pil, factor):
+    """
+    Контрастность (как ImageEnhance.Contrast): смешение с серым цветом средней яркости изображения,
+    т.е. mean + (color - mean) * factor.
+    """
     if image_pil:
-        enhancer = ImageEnhance.Contrast(image_pil)
-        return enhancer.enhance(factor)
+        mean = int(_mean_luminance(image_pil) + 0.5)
+        return _scale_color(image_pil, factor, mean * (1.0 - factor))
     return None
 
 
@@ -55,10 +167,60 @@ def rotate_90_clockwise(image_pil):
 
 
 # --- Новые фильтры ---
+# Режимы, которые OpenCV размывает напрямую: 8 бит на канал, каналы обрабатываются независимо
+CV2_BLUR_MODES = ('L', 'RGB', 'RGBA')
+# Ядро cv2.GaussianBlur растет с радиусом, а box blur Pillow от радиуса не зависит: на больших
+# радиусах Pillow быстрее (4K RGBA: r=2 - 0.04 с против 0.27 с, r=30 - 2.2 с против 0.3 с)
+CV2_BLUR_MAX_RADIUS = 8
+
+
+@lru_cache(maxsize=1)
+def _load_cv2():
+    """
+    Возвращает модуль cv2 или None, если OpenCV не установлен.
+
+    OpenCV необязателен (без него размытие делает Pillow) и импортируется при первом размытии.
+    """
+    try:
+        import cv2
+    except ImportError:
+        return None
+    return cv2
+
+
 def apply_gaussian_blur(image_pil, radius=2):
-    """Применяет Гауссово размытие."""
+    """
+    Применяет Гауссово размытие.
+
+    Если установлен OpenCV и радиус не больше CV2_BLUR_MAX_RADIUS, размывает cv2.GaussianBlur:
+    сепарабельное ядро на SIMD, потоки OpenCV запускает сам. Иначе изображение размывается Pillow полосами параллельно. Каждая
+    полоса берется с запасом margin строк сверху и снизу (охват трех проходов box blur, которыми
+    Pillow приближает Гаусс), поэтому результат совпадает с размытием изображения целиком.
+    """
     if image_pil:
-        return image_pil.filter(ImageFilter.GaussianBlur(radius))
+        cv2 = _load_cv2()
+        if cv2 is not None and image_pil.mode in CV2_BLUR_MODES and 0 < radius <= CV2_BLUR_MAX_RADIUS:
+            # radius в Pillow - это сигма Гаусса; края, как и в Pillow, продолжаются крайними пикселями.
+            # Порядок каналов (RGBA/BGRA) для размытия не важен, поэтому конвертация цвета не нужна
+            blurred = cv2.GaussianBlur(np.asarray(image_pil), (0, 0), sigmaX=radius,
+                                       borderType=cv2.BORDER_REPLICATE)
+            return Image.fromarray(blurred, image_pil.mode)
+
+        width, height = image_pil.size
+        margin = 3 * (int(radius) + 2)
+        band_height = -(-height // _WORKERS)  # Деление с округлением вверх: по полосе на поток
+        if _WORKERS < 2 or band_height <= 2 * margin:
+            return image_pil.filter(ImageFilter.GaussianBlur(radius))
+
+        def blur_band(upper, lower):
+            top, bottom = max(0, upper - margin), min(height, lower + margin)
+            band = image_pil.crop((0, top, width, bottom)).filter(ImageFilter.GaussianBlur(radius))
+            return band.crop((0, upper - top, width, lower - top))
+
+        result = Image.new(image_pil.mode, image_pil.size)
+        for upper, band in zip(range(0, height, band_height), map_bands(blur_band, height, band_height)):
+            result.paste(band, (0, upper))
+        return result
     return None
 
 
@@ -84,6 +246,113 @@ def apply_edge_detect(image_pil):
     return None
 
 
+def get_changed_bbox(before_pil, after_pil):
+    """
+    Находит прямоугольник, в котором два изображения отличаются.
+
+    Returns:
+        tuple | None: (left, upper, right, lower) измененной области или None,
+        если изображения нельзя сравнить попиксельно (разный размер/режим) или они совпадают.
+    """
+    if before_pil is None or after_pil is None:
+        return None
+    if before_pil.size != after_pil.size or before_pil.mode != after_pil.mode:
+        return None
+    before_arr = np.asarray(before_pil)
+    after_arr = np.asarray(after_pil)
+    changed = before_arr != after_arr
+    if changed.ndim == 3:
+        changed = np.any(changed, axis=-1)
+    rows = np.where(np.any(changed, axis=1))[0]
+    if rows.size == 0:
+        return None
+    cols = np.where(np.any(changed, axis=0))[0]
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+# Сторона квадратной плитки (px) при сведении слоев: плитка float32 RGBA 256x256 - 1 МБ, помещается в кэш L2
+COMPOSITE_TILE_SIZE = 256
+
+
+@lru_cache(maxsize=1)
+def _load_composite_over_kernel():
+    """
+    Возвращает ядро "over" на Numba или None, если numba не установлена.
+
+    numba необязательна (без нее сведение слоев идет векторизованным NumPy) и импортируется
+    при первом сведении слоев, а не при запуске приложения: сам импорт занимает сотни мс.
+    """
+    try:
+        import numba
+    except ImportError:
+        return None
+
+    # nogil: плитки параллелятся пулом потоков (map_bands), поэтому ядро само потоков не запускает
+    @numba.njit(nogil=True, fastmath=True, cache=True)
+    def composite_over_kernel(acc, src_rgba):
+        # Один проход по пикселям: "over" без временных массивов NumPy
+        height, width = src_rgba.shape[0], src_rgba.shape[1]
+        for y in range(height):
+            for x in range(width):
+                src_alpha = np.float32(src_rgba[y, x, 3]) * np.float32(1.0 / 255.0)
+                inv_alpha = np.float32(1.0) - src_alpha
+                for c in range(3):
+                    acc[y, x, c] = acc[y, x, c] * inv_alpha + \
+                                   np.float32(src_rgba[y, x, c]) * np.float32(1.0 / 255.0) * src_alpha
+                acc[y, x, 3] = acc[y, x, 3] * inv_alpha + src_alpha
+
+    return composite_over_kernel
+
+
+def composite_over(acc, src_rgba):
+    """
+    Накладывает слой на накопитель композиции (Porter-Duff "over"), изменяя накопитель на месте.
+
+    Args:
+        acc (np.ndarray): Накопитель (H, W, 4), float32, premultiplied RGBA в диапазоне 0..1.
+        src_rgba (np.ndarray): Пиксели слоя (H, W, 4), uint8, обычный RGBA.
+    """
+    kernel = _load_composite_over_kernel()
+    if kernel is not None:
+        kernel(acc, src_rgba)
+        return
+    # Для opacity слоя (будущее): достаточно домножить src_alpha на opacity
+    src = src_rgba.astype(np.float32)
+    src *= 1.0 / 255.0
+    src_alpha = src[..., 3:4]
+    acc *= 1.0 - src_alpha
+    acc[..., :3] += src[..., :3] * src_alpha
+    acc[..., 3:4] += src_alpha
+
+
+def accumulator_to_image(acc):
+    """
+    Переводит накопитель композиции (premultiplied RGBA, float32, 0..1) в PIL Image.
+    Накопитель изменяется на месте.
+    """
+    height, width = acc.shape[:2]
+    out = np.empty(acc.shape, np.uint8)
+
+    def convert_band(upper, lower):
+        # Плитками: все промежуточные операции над плиткой идут, пока она в кэше процессора
+        for left in range(0, width, COMPOSITE_TILE_SIZE):
+            cols = slice(left, left + COMPOSITE_TILE_SIZE)
+            tile = acc[upper:lower, cols]
+            alpha = tile[..., 3:4]
+            # Обратно к непремультиплицированному цвету: один делитель на пиксель вместо трех делений.
+            # При alpha = 0 цвет в накопителе тоже 0, поэтому вместо нуля можно делить на сколь угодно малое число
+            scale = np.maximum(alpha, np.float32(1e-12))
+            np.divide(np.float32(255.0), scale, out=scale)
+            tile[..., :3] *= scale
+            alpha *= np.float32(255.0)
+            tile += np.float32(0.5)
+            np.minimum(tile, np.float32(255.0), out=tile)  # Погрешность float не должна переполнить uint8
+            out[upper:lower, cols] = tile
+
+    map_bands(convert_band, height, COMPOSITE_TILE_SIZE)
+    return Image.fromarray(out)
+
+
 def save_image(image_pil, file_path):
     img_to_save = image_pil
     if file_path.lower().endswith((".jpg", ".jpeg")):
@@ -2,21 +2,64 @@
 # Управляет слоями изображения.
 
 import uuid
+import numpy as np
 from PIL import Image
 from PySide6.QtCore import QObject, Signal
 
+from .image_operations import COMPOSITE_TILE_SIZE, accumulator_to_image, composite_over, map_bands
+from .ui_utils import pil_to_qpixmap
+
+LAYER_THUMBNAIL_SIZE = 32  # Сторона миниатюры слоя в панели слоев (px)
+
 
 class Layer:
-    """Представляет один слой изображения."""
+    """
+    Представляет один слой изображения.
+
+    Изображения слоя не изменяются на месте: каждое действие присваивает image новый объект.
+    Поэтому image и original_image могут безопасно ссылаться на одно и то же изображение.
+    """
 
     def __init__(self, name="Новый слой", image=None, visible=True, opacity=1.0, is_original=False):
         self.id = uuid.uuid4()  # Уникальный идентификатор слоя
         self.name = name
+        self.revision = 0  # Номер версии содержимого: растет при каждой замене image
         self.image = image  # PIL Image object
-        self.original_image = image.copy() if image and is_original else None  # Для сброса
+        self.original_image = image if image and is_original else None  # Для сброса (общий с image, без копии)
         self.visible = visible
         self.opacity = opacity  # От 0.0 до 1.0 (пока не используется в композиции)
 
+    @property
+    def image(self):
+        return self._image
+
+    @image.setter
+    def image(self, value):
+        self._image = value
+        self.revision += 1
+        self._thumb_pixmap = None  # Миниатюра для панели слоев устарела, пересоздается при показе
+
+    @property
+    def thumbnail_outdated(self):
+        """True, если содержимое слоя изменилось после создания миниатюры."""
+        return self._thumb_pixmap is None
+
+    def get_thumbnail(self):
+        """
+        Возвращает миниатюру слоя, создавая ее только после изменения содержимого слоя.
+
+        Returns:
+            QPixmap | None: Миниатюра со стороной не больше LAYER_THUMBNAIL_SIZE или None, если у слоя нет изображения.
+        """
+        if self._thumb_pixmap is None and self.image:
+            width, height = self.image.size
+            scale = LAYER_THUMBNAIL_SIZE / max(width, height)
+            # NEAREST: для миниатюры качество сглаживания не важно, а читает он лишь нужные пиксели
+            small_image = self.image.resize((max(1, round(width * scale)), max(1, round(height * scale))),
+                                            Image.Resampling.NEAREST)
+            self._thumb_pixmap = pil_to_qpixmap(small_image)
+        return self._thumb_pixmap
+
     def __repr__(self):
         return f"Layer(id={self.id}, name='{self.name}', image_exists={self.image is not None})"
 
@@ -33,6 +76,18 @@ class LayerManager(QObject):
         self.layers = []  # Список объектов Layer, нижний слой - первый в списке
         self._active_layer_id = None
         self._layer_name_counter = 1
+        self._composite_cache = None  # Последняя собранная композиция (PIL Image)
+        # Флаг "грязной" композиции и состояние стека, из которого она собрана: если ни то, ни другое
+        # не изменилось, get_composite_image возвращает прошлый результат без пересборки
+        self._composite_dirty = True
+        self._composite_state = None
+        self._last_composite = None
+        self.composite_revision = 0  # Растет при каждой пересборке композиции (ключ для кэшей отображения)
+        # Накопители (premultiplied float32) видимых слоев под активным и над ним. Правки идут
+        # только в активный слой, поэтому композиция = фон + активный слой + верхние слои,
+        # сколько бы слоев ни было в стеке. Сбрасываются при изменении самого стека.
+        self._below_active_cache = None
+        self._above_active_cache = None
 
     def has_layers(self):
         return bool(self.layers)
@@ -48,6 +103,7 @@ class LayerManager(QObject):
             self.layers.append(new_layer)  # Добавляем наверх (в конец списка)
         else:
             self.layers.insert(position, new_layer)
+        self.invalidate_composite()
 
         if not self._active_layer_id or len(self.layers) == 1:  # Если это первый слой или не было активного
             self.set_active_layer_by_id(new_layer.id)
@@ -74,13 +130,62 @@ class LayerManager(QObject):
             self._active_layer_id = None
 
         if old_active_id != self._active_layer_id:
+            # Разбиение стека на "под активным" и "над активным" изменилось
+            self._below_active_cache = None
+            self._above_active_cache = None
             self.active_layer_changed.emit(self._active_layer_id if self._active_layer_id else uuid.UUID(int=0))
 
-    def get_composite_image(self):
-        """Создает композитное изображение из всех видимых слоев."""
+    def invalidate_composite(self):
+        """
+        Сбрасывает кэши композиции: следующий вызов get_composite_image соберет ее целиком.
+        Замену изображений слоев и их видимость get_composite_image отслеживает сам; вызывать
+        нужно при изменении стека слоев и при правке изображения слоя на месте (paste и т.п.).
+        """
+        self._composite_dirty = True
+        self._composite_cache = None
+        self._below_active_cache = None
+        self._above_active_cache = None
+
+    def _stack_state(self):
+        """Состояние стека, от которого зависит композиция: порядок, видимость и версии слоев."""
+        return tuple((layer.id, layer.revision, layer.visible, layer.opacity) for layer in self.layers)
+
+    def get_composite_image(self, dirty_bbox=None):
+        """
+        Создает композитное изображение из всех видимых слоев.
+
+        Args:
+            dirty_bbox (tuple, optional): Область (left, upper, right, lower), в которой изменилось
+                содержимое активного слоя после предыдущего вызова. Если задана и кэш композиции
+                актуален, пересчитывается только эта область, остальное берется из кэша.
+                Изменения остальных слоев (замена image, видимость) обнаруживаются сами
+                и приводят к полной пересборке.
+        """
         if not self.layers:
             return None
 
+        stack_state = self._stack_state()
+        if not self._composite_dirty and stack_state == self._composite_state and self._last_composite is not None:
+            return self._last_composite  # С прошлого вызова ничего не изменилось
+
+        if self._static_layers_changed(stack_state):
+            self.invalidate_composite()  # Изменился не только активный слой: кэши фона/верхних слоев устарели
+        composite_image = self._build_composite_image(dirty_bbox)
+        self._last_composite = composite_image
+        self._composite_state = stack_state
+        self._composite_dirty = False
+        self.composite_revision += 1
+        return composite_image
+
+    def _static_layers_changed(self, stack_state):
+        """Проверяет, изменилось ли в стеке что-то, кроме активного слоя, с прошлой сборки композиции."""
+        if self._composite_state is None or len(stack_state) != len(self._composite_state):
+            return True
+        return any(new != old for new, old in zip(stack_state, self._composite_state)
+                   if new[0] != self._active_layer_id)
+
+    def _build_composite_image(self, dirty_bbox):
+        """Собирает композицию (целиком или только в dirty_bbox, см. get_composite_image)."""
         # Определяем размер композиции по первому слою с изображением
         base_width, base_height = None, None
         for layer in self.layers:  # Ищем первый слой с размерами
@@ -95,42 +200,121 @@ class LayerManager(QObject):
             else:  # Совсем нет изображений ни в одном слое
                 return Image.new("RGBA", (1, 1), (0, 0, 0, 0))  # Возвращаем минимальное пустое изображение
 
-        # Создаем базовое изображение (холст) - полностью прозрачное
-        composite = Image.new("RGBA", (base_width, base_height), (0, 0, 0, 0))
+        canvas_size = (base_width, base_height)
+        visible_layers = [layer for layer in self.layers if layer.visible and layer.image]
+        if len(visible_layers) == 1 and visible_layers[0].image.size == canvas_size:
+            # Единственный видимый слой и есть композиция - смешивать нечего
+            self._composite_cache = None  # Не держим ссылку на изображение слоя как на изменяемый кэш
+            if visible_layers[0].image.mode == 'RGB':
+                return visible_layers[0].image  # Непрозрачный фон показывается как есть, без перевода в RGBA
+            return self._layer_canvas_image(visible_layers[0], canvas_size)
+
+        if dirty_bbox is not None and self._composite_cache is not None and self._composite_cache.size == canvas_size:
+            # Пересобираем только измененную область (в пределах холста) и вставляем ее в закэшированную композицию
+            left, upper = max(dirty_bbox[0], 0), max(dirty_bbox[1], 0)
+            right, lower = min(dirty_bbox[2], base_width), min(dirty_bbox[3], base_height)
+            if left < right and upper < lower:
+                dirty_box = (left, upper, right, lower)
+                self._composite_cache.paste(self._composite_box(canvas_size, dirty_box), dirty_box[:2])
+            return self._composite_cache
+
+        self._composite_cache = self._composite_box(canvas_size, (0, 0, base_width, base_height))
+        return self._composite_cache
+
+    def _layer_canvas_image(self, layer, canvas_size):
+        """Возвращает изображение слоя в режиме RGBA, приведенное к размеру холста canvas_size."""
+        base_width, base_height = canvas_size
+        # Убедимся, что слой имеет тот же размер, что и холст
+        # (В будущем здесь может быть логика смещения слоя или масштабирования)
+        if layer.image.size != canvas_size:
+            # Простое решение: если размер не совпадает, пропускаем слой или центрируем/обрезаем
+            # Пока пропустим, чтобы избежать ошибок. В реальном приложении нужна обработка.
+            print(
+                f"Предупреждение: Слой '{layer.name}' имеет размер {layer.image.size}, а холст {base_width}x{base_height}. Слой пропущен в композиции.")
+            # continue # Раскомментировать, если нужно строгое совпадение размеров
+            # Вместо пропуска, создадим временное изображение нужного размера и вставим туда слой
+            temp_layer_canvas = Image.new("RGBA", (base_width, base_height), (0, 0, 0, 0))
+            # Простое размещение в левом верхнем углу, если слой меньше
+            paste_x = 0
+            paste_y = 0
+            # Можно добавить логику центрирования или обрезки здесь
+            temp_layer_canvas.paste(layer.image, (paste_x, paste_y),
+                                    layer.image if layer.image.mode == 'RGBA' else None)
+            return temp_layer_canvas
+        if layer.image.mode != 'RGBA':
+            return layer.image.convert("RGBA")
+        return layer.image
+
+    def _composite_box(self, canvas_size, box):
+        """Сводит видимые слои в пределах области box (left, upper, right, lower) холста canvas_size."""
+        left, upper, right, lower = box
+        active_layer = self.get_active_layer()
+
+        if active_layer is None:
+            # Один накопитель float32 на всю область (premultiplied RGBA, 0..1) - полностью прозрачный
+            acc = np.zeros((lower - upper, right - left, 4), np.float32)
+            self._blend_layers(acc, self.layers, canvas_size, box)
+            return accumulator_to_image(acc)
 
-        for layer in self.layers:  # Слои рисуются снизу вверх
+        self._ensure_static_composites(canvas_size, self.layers.index(active_layer))
+        rows, cols = slice(upper, lower), slice(left, right)
+
+        acc = self._below_active_cache[rows, cols].copy()
+        self._blend_layers(acc, [active_layer], canvas_size, box)
+        above = self._above_active_cache[rows, cols]
+        acc *= 1.0 - above[..., 3:4]  # Верхние слои уже премультиплицированы: просто "over"
+        acc += above
+        return accumulator_to_image(acc)
+
+    def _ensure_static_composites(self, canvas_size, active_index):
+        """Собирает (при необходимости) накопители слоев под активным и над ним на весь холст."""
+        shape = (canvas_size[1], canvas_size[0], 4)
+        full_box = (0, 0) + tuple(canvas_size)
+        if self._below_active_cache is None or self._below_active_cache.shape != shape:
+            self._below_active_cache = np.zeros(shape, np.float32)
+            self._blend_layers(self._below_active_cache, self.layers[:active_index], canvas_size, full_box)
+        if self._above_active_cache is None or self._above_active_cache.shape != shape:
+            self._above_active_cache = np.zeros(shape, np.float32)
+            self._blend_layers(self._above_active_cache, self.layers[active_index + 1:], canvas_size, full_box)
+
+    def _blend_layers(self, acc, layers, canvas_size, box):
+        """Накладывает видимые слои из layers (снизу вверх) на накопитель acc в пределах области box."""
+        full_canvas = box == (0, 0) + tuple(canvas_size)
+        sources = []  # (изображение слоя в пределах box, границы его непрозрачных пикселей)
+        for layer in layers:  # Слои рисуются снизу вверх
             if layer.visible and layer.image:
-                # Убедимся, что слой имеет тот же размер, что и холст
-                # (В будущем здесь может быть логика смещения слоя или масштабирования)
-                if layer.image.size != (base_width, base_height):
-                    # Простое решение: если размер не совпадает, пропускаем слой или центрируем/обрезаем
-                    # Пока пропустим, чтобы избежать ошибок. В реальном приложении нужна обработка.
-                    print(
-                        f"Предупреждение: Слой '{layer.name}' имеет размер {layer.image.size}, а холст {base_width}x{base_height}. Слой пропущен в композиции.")
-                    # continue # Раскомментировать, если нужно строгое совпадение размеров
-                    # Вместо пропуска, создадим временное изображение нужного размера и вставим туда слой
-                    temp_layer_canvas = Image.new("RGBA", (base_width, base_height), (0, 0, 0, 0))
-                    # Простое размещение в левом верхнем углу, если слой меньше
-                    paste_x = 0
-                    paste_y = 0
-                    # Можно добавить логику центрирования или обрезки здесь
-                    temp_layer_canvas.paste(layer.image, (paste_x, paste_y),
-                                            layer.image if layer.image.mode == 'RGBA' else None)
-                    image_to_composite = temp_layer_canvas
-                else:
-                    image_to_composite = layer.image
-
-                # Простое наложение с учетом альфа-канала слоя
-                # Для opacity слоя (будущее): можно создать альфа-маску с учетом layer.opacity
-                if image_to_composite.mode == 'RGBA':
-                    composite.alpha_composite(image_to_composite)
-                else:  # Если слой не RGBA, конвертируем его для безопасного alpha_composite
-                    composite.alpha_composite(image_to_composite.convert("RGBA"))
-        return composite
+                image_to_composite = self._layer_canvas_image(layer, canvas_size)
+                if not full_canvas:
+                    image_to_composite = image_to_composite.crop(box)
+                content_bbox = image_to_composite.getbbox()
+                if content_bbox is not None:  # Полностью прозрачный слой ничего не меняет
+                    sources.append((image_to_composite, content_bbox))
+
+        # Обход плитками: плитка накопителя остается в кэше процессора, пока на нее накладываются
+        # все слои, вместо того чтобы каждый слой заново прогонял через память весь холст.
+        # Ряды плиток не пересекаются и считаются параллельно (см. image_operations.map_bands).
+        height, width = acc.shape[:2]
+
+        def blend_tile_row(tile_upper, tile_lower):
+            for tile_left in range(0, width, COMPOSITE_TILE_SIZE):
+                tile_right = min(tile_left + COMPOSITE_TILE_SIZE, width)
+                for image_to_composite, (left, upper, right, lower) in sources:
+                    # Смешиваем только пересечение плитки с содержимым слоя
+                    left, upper = max(left, tile_left), max(upper, tile_upper)
+                    right, lower = min(right, tile_right), min(lower, tile_lower)
+                    if left >= right or upper >= lower:
+                        continue
+                    # Наложение Porter-Duff "over" прямо в накопитель (срез - представление, не копия)
+                    composite_over(acc[upper:lower, left:right],
+                                   np.asarray(image_to_composite.crop((left, upper, right, lower))))
+
+        if sources:
+            map_bands(blend_tile_row, height, COMPOSITE_TILE_SIZE)
 
     def clear_all_layers(self):
         self.layers = []
         self._active_layer_id = None
         self._layer_name_counter = 1
+        self.invalidate_composite()
         # Нужно будет также очистить историю, связанную с этими слоями
         # self.layers_reordered.emit() # Или какой-то сигнал об очистке
\ No newline at end of file
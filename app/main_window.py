@@ -3,25 +3,79 @@
 
 import sys
 import os 
+from functools import partial
+from typing import TYPE_CHECKING
 from PySide6.QtWidgets import (
-    QMainWindow, QLabel, QFileDialog, QScrollArea,
-    QMessageBox, QSizePolicy, QInputDialog, QToolBar,
+    QMainWindow, QLabel, QFileDialog, QGraphicsView, QGraphicsScene, QGraphicsPixmapItem,
+    QMessageBox, QInputDialog, QToolBar,
     QDockWidget, QListWidget, QListWidgetItem, QVBoxLayout,
     QWidget, QPushButton, QHBoxLayout, QSpacerItem, QLayout
 )
 
-from PySide6.QtGui import QPixmap, QImage, QAction, QGuiApplication, QIcon, QKeySequence, QColor, QCloseEvent
+from PySide6.QtGui import (QPixmap, QAction, QActionGroup, QGuiApplication, QIcon, QKeySequence, QColor,
+                           QCloseEvent, QPainter, QTransform, QOpenGLContext)
+from PySide6.QtOpenGLWidgets import QOpenGLWidget
 from PySide6.QtWidgets import QStyle 
-from PySide6.QtCore import Qt, Slot, QDir, QSize
-from PIL import Image, ImageQt, UnidentifiedImageError 
-from PySide6.QtWidgets import QColorDialog, QSlider 
+from PySide6.QtCore import Qt, Slot, Signal, QDir, QSize, QTimer, QObject, QRunnable, QThreadPool
+from PIL import Image, UnidentifiedImageError 
+from PySide6.QtWidgets import QColorDialog, QSlider, QDialog, QComboBox
 
 
-from .drawing_canvas import DrawingCanvas # Используем относительный импорт для модулей внутри пакета
 from . import image_operations 
 from .gradient_utils import create_linear_gradient 
-from .layer_manager import LayerManager, Layer 
+from .layer_manager import LAYER_THUMBNAIL_SIZE, LayerManager, Layer 
 from .history_manager import HistoryManager 
+from .ui_utils import pil_to_qpixmap, qimage_to_pil
+
+if TYPE_CHECKING:
+    # Холст рисования импортируется при первом сеансе рисования, а не при запуске приложения
+    from .drawing_canvas import DrawingCanvas
+
+# Стандартные иконки Qt, которые подставляются, если в ресурсах нет собственного файла
+_ICON_FALLBACKS = {
+    "open.png": QStyle.StandardPixmap.SP_DialogOpenButton,
+    "save.png": QStyle.StandardPixmap.SP_DialogSaveButton,
+    "new_file.png": QStyle.StandardPixmap.SP_FileIcon,
+    "undo.png": QStyle.StandardPixmap.SP_ArrowBack,
+    "redo.png": QStyle.StandardPixmap.SP_ArrowForward,
+}
+
+# Интервал (мс), за который сообщения строки состояния сливаются в одно
+STATUS_COALESCE_MS = 30
+
+# Через сколько мс после последнего шага масштабирования быстрый предпросмотр заменяется сглаженным
+SMOOTH_ZOOM_DELAY_MS = 150
+
+# Максимальная частота обработки движений мыши на холсте рисования (Гц)
+DRAWING_THROTTLE_HZ = 125
+
+class _ImageLoaderSignals(QObject):
+    """Сигналы фоновой загрузки изображения (QRunnable сам сигналов иметь не может)."""
+    loaded = Signal(object, str)  # (PIL Image в RGBA, путь к файлу)
+    failed = Signal(object, str)  # (исключение, путь к файлу)
+
+
+class _ImageLoader(QRunnable):
+    """
+    Декодирует файл изображения в PIL Image в пуле потоков: RGBA, если в файле есть прозрачность,
+    иначе RGB (фильтры и отображение такого слоя обходятся без альфа-канала).
+    Работает только с PIL - виджеты и QPixmap трогаются лишь в главном потоке.
+    """
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+        self.signals = _ImageLoaderSignals()
+
+    def run(self):
+        try:
+            with Image.open(self.file_path) as image_file:
+                has_alpha = 'A' in image_file.getbands() or 'transparency' in image_file.info
+                pil_img = image_file.convert("RGBA" if has_alpha else "RGB")
+        except Exception as e:
+            self.signals.failed.emit(e, self.file_path)
+            return
+        self.signals.loaded.emit(pil_img, self.file_path)
+
 
 class ImageEditorWindow(QMainWindow):
     """
@@ -30,6 +84,8 @@ class ImageEditorWindow(QMainWindow):
     Предоставляет пользовательский интерфейс для открытия, сохранения,
     редактирования изображений с использованием слоев, фильтров и инструментов рисования.
     """
+    _icon_cache = {}  # Имя иконки -> QIcon, общий для всех окон
+
     def __init__(self, resources_path): 
         """
         Инициализирует главное окно редактора.
@@ -55,40 +111,56 @@ class ImageEditorWindow(QMainWindow):
         self.history_manager = HistoryManager()
 
         self.layer_manager.active_layer_changed.connect(self.on_active_layer_changed_for_history_and_ui)
+        # Элементы панели слоев по ID слоя: refresh_layer_list правит их на месте, а не пересоздает список
+        self._list_items_by_id = {}
 
         self.current_pixmap_for_zoom = None
         self.current_zoom_factor = 1.0
-
-        self.image_label = QLabel("Создайте или откройте изображение (Ctrl+O или Ctrl+N)")
-        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.image_label.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Preferred)
-        self.image_label.setStyleSheet("border: 1px solid gray;") 
-        self.image_label.adjustSize() 
-        self.image_label.setAutoFillBackground(False) 
-
-        self.image_label_container = QWidget()
-        self.image_label_container.setAutoFillBackground(False) 
-
-        h_layout = QHBoxLayout()
-        h_layout.setContentsMargins(0,0,0,0) 
-        h_layout.addStretch() 
-        h_layout.addWidget(self.image_label)
-        h_layout.addStretch() 
-
-        v_layout = QVBoxLayout(self.image_label_container) 
-        v_layout.setContentsMargins(0,0,0,0)
-        v_layout.addStretch() 
-        v_layout.addLayout(h_layout) 
-        v_layout.addStretch() 
-
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True) 
-        self.scroll_area.setWidget(self.image_label_container) 
-
-        self.setCentralWidget(self.scroll_area)
-
-        self.drawing_canvas = None
+        # Версия композиции, из которой собран current_pixmap_for_zoom (LayerManager.composite_revision)
+        self._composite_version = None
+        # Масштабирование в два этапа: сразу быстрое, после паузы - сглаженное
+        self._smooth_zoom_timer = QTimer(self)
+        self._smooth_zoom_timer.setSingleShot(True)
+        self._smooth_zoom_timer.setInterval(SMOOTH_ZOOM_DELAY_MS)
+        self._smooth_zoom_timer.timeout.connect(self._refine_zoom)
+
+        # Композиция показывается одним QGraphicsPixmapItem: масштаб и прокрутка - преобразования вида,
+        # а не перерисовка масштабированных копий. Холст рисования - еще один элемент той же сцены.
+        self._scene = QGraphicsScene(self)
+        self._view = QGraphicsView(self._scene)
+        if QOpenGLContext().create():
+            # Без OpenGL (удаленный рабочий стол, offscreen) остается обычный растровый viewport
+            self._view.setViewport(QOpenGLWidget())
+        self._view.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        self._view.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self._pix_item = QGraphicsPixmapItem()
+        self._pix_item.setTransformationMode(Qt.TransformationMode.SmoothTransformation)
+        self._scene.addItem(self._pix_item)
+        self._placeholder_item = self._scene.addText("")
+        self._show_placeholder("Создайте или откройте изображение (Ctrl+O или Ctrl+N)")
+
+        self.setCentralWidget(self._view)
+
+        self.drawing_canvas: "DrawingCanvas | None" = None
         self.is_drawing_active = False 
+        self._gradient_dialog = None  # Диалог направления градиента (создается при первом использовании)
+        self._gradient_dir_box = None
+        self._image_loaders = set()  # Сигналы загрузок в процессе: держим ссылки до их завершения
+
+        # Сообщения строки состояния сливаются: за интервал таймера перерисовывается только последнее
+        self._pending_status = ""
+        self._status_timer = QTimer(self)
+        self._status_timer.setSingleShot(True)
+        self._status_timer.setInterval(STATUS_COALESCE_MS)
+        self._status_timer.timeout.connect(lambda: self.statusBar().showMessage(self._pending_status))
+
+        # Запросы перерисовки композиции за одну итерацию цикла событий сливаются в одну пересборку
+        # (например, добавление слоя и вызванная им смена активного слоя)
+        self._pending_dirty_bbox = None
+        self._composite_redraw_timer = QTimer(self)
+        self._composite_redraw_timer.setSingleShot(True)
+        self._composite_redraw_timer.setInterval(0)
+        self._composite_redraw_timer.timeout.connect(self._do_composite_redraw)
 
         self.init_drawing_tools()
         self._create_actions()
@@ -96,13 +168,14 @@ class ImageEditorWindow(QMainWindow):
         self._create_toolbar()
         self._create_layer_panel() 
 
-        self.statusBar().showMessage("Готово к работе!")
+        self._post_status("Готово к работе!")
         self._update_actions_enabled_state()
 
     def _get_icon(self, name: str) -> QIcon:
         """
         Загружает иконку по имени из папки ресурсов.
         Если кастомная иконка не найдена, пытается загрузить стандартную иконку Qt.
+        Результат кэшируется, повторные запросы не обращаются к диску.
 
         Args:
             name (str): Имя файла иконки (например, "open.png").
@@ -110,21 +183,29 @@ class ImageEditorWindow(QMainWindow):
         Returns:
             QIcon: Загруженная иконка или пустая иконка, если ничего не найдено.
         """
+        if name in self._icon_cache:
+            return self._icon_cache[name]
+
         icon_path = os.path.join(self.icons_path, name)
         if os.path.exists(icon_path):
-            return QIcon(icon_path)
-        
-        if name == "open.png":
-            return self.style().standardIcon(QStyle.StandardPixmap.SP_DialogOpenButton)
-        elif name == "save.png":
-            return self.style().standardIcon(QStyle.StandardPixmap.SP_DialogSaveButton)
-        elif name == "new_file.png": 
-             return self.style().standardIcon(QStyle.StandardPixmap.SP_FileIcon) 
-        elif name == "undo.png":
-            return self.style().standardIcon(QStyle.StandardPixmap.SP_ArrowBack)
-        elif name == "redo.png":
-            return self.style().standardIcon(QStyle.StandardPixmap.SP_ArrowForward)
-        return QIcon() 
+            icon = QIcon(icon_path)
+        else:
+            standard_pixmap = _ICON_FALLBACKS.get(name)
+            icon = self.style().standardIcon(standard_pixmap) if standard_pixmap is not None else QIcon() 
+
+        self._icon_cache[name] = icon
+        return icon
+
+    def _post_status(self, message: str):
+        """
+        Показывает сообщение в строке состояния.
+
+        При частых вызовах (ползунок размера кисти, масштабирование) строка состояния
+        перерисовывается не чаще раза в STATUS_COALESCE_MS и показывает последнее сообщение.
+        """
+        self._pending_status = message
+        if not self._status_timer.isActive():
+            self._status_timer.start()
 
     def init_drawing_tools(self):
         """Инициализирует QAction и виджеты для инструментов рисования."""
@@ -138,15 +219,24 @@ class ImageEditorWindow(QMainWindow):
 
         self.rect_action = QAction(self._get_icon("rectangle.png"), "Прямоугольник", self) 
         self.rect_action.setCheckable(True)
-        self.rect_action.triggered.connect(lambda: self.activate_shape_mode("rect"))
+        self.rect_action.triggered.connect(partial(self.activate_shape_mode, "rect"))
 
         self.ellipse_action = QAction(self._get_icon("ellipse.png"), "Овал", self) 
         self.ellipse_action.setCheckable(True)
-        self.ellipse_action.triggered.connect(lambda: self.activate_shape_mode("ellipse"))
+        self.ellipse_action.triggered.connect(partial(self.activate_shape_mode, "ellipse"))
 
         self.line_action = QAction(self._get_icon("line.png"), "Линия", self) 
         self.line_action.setCheckable(True)
-        self.line_action.triggered.connect(lambda: self.activate_shape_mode("line"))
+        self.line_action.triggered.connect(partial(self.activate_shape_mode, "line"))
+
+        # Действия фигур по режиму - таблица строится один раз, а не при каждом переключении
+        self._shape_actions = {"rect": self.rect_action, "ellipse": self.ellipse_action, "line": self.line_action}
+
+        # Взаимоисключение инструментов делает сама группа: включение одного снимает отметку с остальных
+        self._tool_group = QActionGroup(self)
+        self._tool_group.setExclusive(True)
+        for tool_action in (self.brush_action, self.eraser_action, self.rect_action, self.ellipse_action, self.line_action):
+            self._tool_group.addAction(tool_action)
 
         self.color_action = QAction(self._get_icon("color_picker.png"), "Цвет кисти/фигуры", self) 
         self.color_action.triggered.connect(self.select_brush_color)
@@ -169,11 +259,9 @@ class ImageEditorWindow(QMainWindow):
 
     def _reset_drawing_tool_actions_check_state(self):
         """Снимает выделение (checked state) со всех кнопок инструментов рисования на тулбаре."""
-        self.brush_action.setChecked(False)
-        self.eraser_action.setChecked(False)
-        self.rect_action.setChecked(False)
-        self.ellipse_action.setChecked(False)
-        self.line_action.setChecked(False)
+        checked_action = self._tool_group.checkedAction()
+        if checked_action:
+            checked_action.setChecked(False)
 
     def _create_actions(self):
         """Создает все QAction для меню и панелей инструментов."""
@@ -361,6 +449,7 @@ class ImageEditorWindow(QMainWindow):
 
         self.layer_list_widget = QListWidget()
         self.layer_list_widget.setAlternatingRowColors(True)
+        self.layer_list_widget.setIconSize(QSize(LAYER_THUMBNAIL_SIZE, LAYER_THUMBNAIL_SIZE))
         self.layer_list_widget.currentItemChanged.connect(self.on_layer_selection_changed_in_listwidget)
         layer_layout.addWidget(self.layer_list_widget)
 
@@ -376,14 +465,14 @@ class ImageEditorWindow(QMainWindow):
     def activate_brush_mode(self):
         """Активирует инструмент 'Кисть'."""
         self.start_drawing_session(mode='brush')
-        self._reset_drawing_tool_actions_check_state() 
-        self.brush_action.setChecked(True) 
+        if self.is_drawing_active:
+            self.brush_action.setChecked(True) 
 
     def activate_eraser_mode(self):
         """Активирует инструмент 'Ластик'."""
         self.start_drawing_session(mode='eraser')
-        self._reset_drawing_tool_actions_check_state()
-        self.eraser_action.setChecked(True)
+        if self.is_drawing_active:
+            self.eraser_action.setChecked(True)
 
     def activate_shape_mode(self, shape_mode: str):
         """
@@ -393,15 +482,12 @@ class ImageEditorWindow(QMainWindow):
             shape_mode (str): Тип фигуры ('rect', 'ellipse', 'line').
         """
         self.start_drawing_session(mode=shape_mode)
-        self._reset_drawing_tool_actions_check_state()
-        
-        actions_map = {
-            "rect": self.rect_action,
-            "ellipse": self.ellipse_action,
-            "line": self.line_action
-        }
-        if shape_mode in actions_map: 
-            actions_map[shape_mode].setChecked(True)
+        if not self.is_drawing_active:
+            return
+
+        shape_action = self._shape_actions.get(shape_mode)
+        if shape_action is not None:
+            shape_action.setChecked(True)
 
     def start_drawing_session(self, mode: str = 'brush'):
         """
@@ -413,48 +499,36 @@ class ImageEditorWindow(QMainWindow):
             self._reset_drawing_tool_actions_check_state() 
             return
 
-        target_canvas_width = 0
-        target_canvas_height = 0
-
-        if self.current_pixmap_for_zoom and not self.current_pixmap_for_zoom.isNull():
-            target_canvas_width = self.current_pixmap_for_zoom.width()
-            target_canvas_height = self.current_pixmap_for_zoom.height()
-        elif active_layer.image: 
-            target_canvas_width = active_layer.image.width
-            target_canvas_height = active_layer.image.height
+        # Холст всегда в исходном разрешении слоя и лежит в сцене поверх композиции:
+        # масштабирует его вид, поэтому при применении рисунок не нужно пересэмплировать
+        target_canvas_width = active_layer.image.width
+        target_canvas_height = active_layer.image.height
         
         if target_canvas_width <= 0 or target_canvas_height <= 0:
             QMessageBox.warning(self, "Ошибка размера", f"Недопустимый размер для холста рисования: {target_canvas_width}x{target_canvas_height}.")
             self._reset_drawing_tool_actions_check_state()
             return
             
-        recreate_canvas = False
-        if not self.drawing_canvas: 
-            recreate_canvas = True
-        elif self.drawing_canvas.size() != QSize(target_canvas_width, target_canvas_height):
-            recreate_canvas = True
-        
-        if recreate_canvas:
-            if self.drawing_canvas: 
-                self.drawing_canvas.hide()
-                self.drawing_canvas.deleteLater()
-                self.drawing_canvas = None 
-            
-            self.drawing_canvas = DrawingCanvas(self.image_label, target_canvas_width, target_canvas_height)
-            initial_pen_color = self.drawing_canvas.pen_color 
-            self.drawing_canvas.set_pen_color(initial_pen_color if initial_pen_color.isValid() else QColor(Qt.GlobalColor.black))
+        if self.drawing_canvas is None:
+            from .drawing_canvas import DrawingCanvas  # Используем относительный импорт для модулей внутри пакета
+            self.drawing_canvas = DrawingCanvas(None, target_canvas_width, target_canvas_height,
+                                                throttle_hz=DRAWING_THROTTLE_HZ)
+            self.drawing_canvas.set_pen_color(QColor(Qt.GlobalColor.black))
             self.drawing_canvas.set_pen_width(self.brush_size_slider.value())
-            self.drawing_canvas.show() 
-            self.drawing_canvas.move(0, 0) 
-        
+            canvas_proxy = self._scene.addWidget(self.drawing_canvas)
+            canvas_proxy.setZValue(1)  # Над композицией
+            canvas_proxy.setPos(0, 0)
+        else:
+            # Один холст на все сеансы: при другом размере слоя меняется только его изображение
+            self.drawing_canvas.set_canvas_size(target_canvas_width, target_canvas_height)
+
         if self.drawing_canvas and not self.drawing_canvas.isVisible():
             self.drawing_canvas.show()
-            self.drawing_canvas.move(0,0)
 
         if self.drawing_canvas: 
             self.drawing_canvas.set_mode(mode) 
             self.is_drawing_active = True 
-            self.statusBar().showMessage(f"Режим: {mode}. Цвет: {self.drawing_canvas.pen_color.name()}, Размер: {self.drawing_canvas.pen_width}")
+            self._post_status(f"Режим: {mode}. Цвет: {self.drawing_canvas.pen_color.name()}, Размер: {self.drawing_canvas.pen_width}")
         else: 
             self.is_drawing_active = False
             self._reset_drawing_tool_actions_check_state() 
@@ -471,10 +545,10 @@ class ImageEditorWindow(QMainWindow):
         if color.isValid():
             if self.drawing_canvas and self.is_drawing_active: 
                 self.drawing_canvas.set_pen_color(color)
-                self.statusBar().showMessage(f"Новый цвет кисти/фигуры: {color.name()}")
+                self._post_status(f"Новый цвет кисти/фигуры: {color.name()}")
             elif self.drawing_canvas: 
                  self.drawing_canvas.set_pen_color(color) 
-                 self.statusBar().showMessage(f"Цвет {color.name()} будет использован для следующего рисунка.")
+                 self._post_status(f"Цвет {color.name()} будет использован для следующего рисунка.")
             else: 
                 QMessageBox.information(self, "Информация", "Сначала активируйте инструмент рисования или фигуру.")
 
@@ -486,16 +560,22 @@ class ImageEditorWindow(QMainWindow):
         if self.drawing_canvas: 
             self.drawing_canvas.set_pen_width(value)
             if self.is_drawing_active: 
-                self.statusBar().showMessage(f"Новый размер кисти/фигуры: {value}")
+                self._post_status(f"Новый размер кисти/фигуры: {value}")
 
     def clear_drawing_canvas_content(self): 
         """Очищает содержимое текущего DrawingCanvas (непримененный рисунок)."""
         if self.drawing_canvas and self.is_drawing_active: 
             self.drawing_canvas.clear_canvas()
-            self.statusBar().showMessage("Холст для рисования очищен.")
+            self._post_status("Холст для рисования очищен.")
         else:
-            self.statusBar().showMessage("Нет активного холста для рисования, чтобы очищать.")
+            self._post_status("Нет активного холста для рисования, чтобы очищать.")
+
 
+    def _hide_drawing_canvas(self):
+        """Очищает и прячет холст рисования. Сам холст остается в сцене для следующего сеанса."""
+        if self.drawing_canvas:
+            self.drawing_canvas.clear_canvas()
+            self.drawing_canvas.hide()
 
     def apply_drawing_to_layer(self):
         """Применяет текущий рисунок с DrawingCanvas к активному слою."""
@@ -506,35 +586,31 @@ class ImageEditorWindow(QMainWindow):
 
         try:
             drawing_qimage = self.drawing_canvas.get_image() 
-            pil_drawing = ImageQt.fromqimage(drawing_qimage.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied))
+            pil_drawing = qimage_to_pil(drawing_qimage)
             
-            if self.drawing_canvas:
-                self.drawing_canvas.hide()
-                self.drawing_canvas.deleteLater() 
-                self.drawing_canvas = None 
+            self._hide_drawing_canvas()
             self.is_drawing_active = False 
             self._reset_drawing_tool_actions_check_state() 
 
-            self.history_manager.add_state(active_layer.id, active_layer.image.copy())
+            dirty_bbox = pil_drawing.getbbox()  # Рисунок затрагивает только эту область
+            if dirty_bbox is None:
+                self._post_status("Холст рисования пуст: слой не изменен.")
+                self._update_actions_enabled_state()
+                return
 
             base_pil = active_layer.image.convert("RGBA") 
-            
-            if base_pil.size != pil_drawing.size:
-                 pil_drawing = pil_drawing.resize(base_pil.size, Image.Resampling.LANCZOS)
-
-            base_pil.alpha_composite(pil_drawing) 
+            # Накладываем только непрозрачную часть рисунка: работа пропорциональна размеру штриха, а не холста
+            base_pil.alpha_composite(pil_drawing.crop(dirty_bbox), dest=dirty_bbox[:2]) 
+            # В историю - только разница в затронутой области, а не копия всего слоя
+            self.history_manager.add_change(active_layer.id, active_layer.image, base_pil, bbox=dirty_bbox)
             active_layer.image = base_pil 
 
-            self.update_composite_image_display() 
-            self.statusBar().showMessage(f"Рисунок применен к слою '{active_layer.name}'")
+            self._request_composite_redraw(dirty_bbox=dirty_bbox) 
+            self._post_status(f"Рисунок применен к слою '{active_layer.name}'")
             self._update_actions_enabled_state() 
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка применения рисунка", f"Не удалось применить рисунок: {e}")
-            if active_layer and self.history_manager.can_undo(active_layer.id):
-                 undone_image_state_after_failed_apply = self.history_manager.undo(active_layer.id)
-                 if undone_image_state_after_failed_apply: 
-                     active_layer.image = undone_image_state_after_failed_apply
             self._update_actions_enabled_state() 
 
 
@@ -545,35 +621,15 @@ class ImageEditorWindow(QMainWindow):
             QMessageBox.warning(self, "Нет слоя", "Нет активного слоя для применения градиента.")
             return
 
-        from PySide6.QtWidgets import QDialog, QComboBox 
-        
         start_color_q = QColorDialog.getColor(Qt.GlobalColor.white, self, "Начальный цвет градиента")
         if not start_color_q.isValid(): return
         end_color_q = QColorDialog.getColor(Qt.GlobalColor.black, self, "Конечный цвет градиента")
         if not end_color_q.isValid(): return
         
-        direction_box = QComboBox()
-        direction_box.addItems(["Горизонтальный", "Вертикальный"])
-        direction_box.setCurrentIndex(0)
-        
-        direction_dialog = QDialog(self)
-        direction_dialog.setWindowTitle("Направление градиента")
-        layout = QVBoxLayout(direction_dialog)
-        layout.addWidget(QLabel("Выберите направление градиента:"))
-        layout.addWidget(direction_box)
-        buttons = QHBoxLayout()
-        ok_btn = QPushButton("OK")
-        cancel_btn = QPushButton("Отмена")
-        ok_btn.clicked.connect(direction_dialog.accept)
-        cancel_btn.clicked.connect(direction_dialog.reject)
-        buttons.addWidget(ok_btn)
-        buttons.addWidget(cancel_btn)
-        layout.addLayout(buttons)
-
-        if direction_dialog.exec() != QDialog.DialogCode.Accepted:
+        if self._get_gradient_dialog().exec() != QDialog.DialogCode.Accepted:
             return
         
-        direction = 'horizontal' if direction_box.currentText() == "Горизонтальный" else 'vertical'
+        direction = self._gradient_dir_box.currentData()
 
         width, height = active_layer.image.size
         start_rgba = (start_color_q.red(), start_color_q.green(), start_color_q.blue(), start_color_q.alpha())
@@ -582,22 +638,46 @@ class ImageEditorWindow(QMainWindow):
         try:
             gradient_img_pil = create_linear_gradient(width, height, start_rgba, end_rgba, direction)
             if gradient_img_pil:
-                self.history_manager.add_state(active_layer.id, active_layer.image.copy())
+                self.history_manager.add_change(active_layer.id, active_layer.image, gradient_img_pil)
                 active_layer.image = gradient_img_pil
-                self.update_composite_image_display()
-                self.statusBar().showMessage("Градиент применен к активному слою.")
+                self._request_composite_redraw()
+                self._post_status("Градиент применен к активному слою.")
             else:
                 QMessageBox.warning(self, "Ошибка градиента", "Не удалось создать изображение градиента.")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка градиента", f"Не удалось применить градиент: {e}")
 
+    def _get_gradient_dialog(self):
+        """Возвращает диалог выбора направления градиента; создается при первом вызове и затем переиспользуется."""
+        if self._gradient_dialog is not None:
+            return self._gradient_dialog
+
+        self._gradient_dir_box = QComboBox()
+        self._gradient_dir_box.addItem("Горизонтальный", 'horizontal')
+        self._gradient_dir_box.addItem("Вертикальный", 'vertical')
+        self._gradient_dir_box.setCurrentIndex(0)
+        
+        direction_dialog = QDialog(self)
+        direction_dialog.setWindowTitle("Направление градиента")
+        layout = QVBoxLayout(direction_dialog)
+        layout.addWidget(QLabel("Выберите направление градиента:"))
+        layout.addWidget(self._gradient_dir_box)
+        buttons = QHBoxLayout()
+        ok_btn = QPushButton("OK")
+        cancel_btn = QPushButton("Отмена")
+        ok_btn.clicked.connect(direction_dialog.accept)
+        cancel_btn.clicked.connect(direction_dialog.reject)
+        buttons.addWidget(ok_btn)
+        buttons.addWidget(cancel_btn)
+        layout.addLayout(buttons)
+
+        self._gradient_dialog = direction_dialog
+        return self._gradient_dialog
+
     @Slot()
     def create_new_image_dialog(self):
         """Открывает диалог для создания нового изображения."""
-        if self.drawing_canvas:
-            self.drawing_canvas.hide()
-            self.drawing_canvas.deleteLater()
-            self.drawing_canvas = None
+        self._hide_drawing_canvas()
         self.is_drawing_active = False
         self._reset_drawing_tool_actions_check_state()
 
@@ -622,17 +702,14 @@ class ImageEditorWindow(QMainWindow):
         if self.layer_manager.layers:
              self.layer_manager.set_active_layer_by_id(self.layer_manager.layers[-1].id)
 
-        self.update_composite_image_display() 
-        self.statusBar().showMessage(f"Создано новое изображение {width}x{height}")
-        self.current_zoom_factor = 1.0 
+        self._request_composite_redraw() 
+        self._post_status(f"Создано новое изображение {width}x{height}")
+        self._reset_zoom()
 
     @Slot()
     def open_image_dialog(self):
         """Открывает диалог для выбора и загрузки изображения."""
-        if self.drawing_canvas:
-            self.drawing_canvas.hide()
-            self.drawing_canvas.deleteLater()
-            self.drawing_canvas = None
+        self._hide_drawing_canvas()
         self.is_drawing_active = False
         self._reset_drawing_tool_actions_check_state()
 
@@ -642,31 +719,49 @@ class ImageEditorWindow(QMainWindow):
             "Файлы изображений (*.png *.jpg *.jpeg *.bmp *.gif);;Все файлы (*)"
         )
         if file_path: 
-            try:
-                if not self.layer_manager.has_layers() or not self.layer_manager.get_active_layer():
-                    self.layer_manager.clear_all_layers()
-                    self.history_manager.clear_all_history()
-                
-                pil_img = Image.open(file_path).convert("RGBA") 
-                
-                layer_name = os.path.basename(file_path) 
-                self.layer_manager.add_layer(image=pil_img, name=layer_name, is_original=True)
-                
-                self.refresh_layer_list()
-                if self.layer_manager.layers: 
-                    self.layer_manager.set_active_layer_by_id(self.layer_manager.layers[-1].id)
-
-                self.update_composite_image_display()
-                self.statusBar().showMessage(f"Открыто: {file_path}")
-                self.current_zoom_factor = 1.0 
-            except FileNotFoundError:
-                QMessageBox.critical(self, "Ошибка", f"Файл не найден: {file_path}")
-            except UnidentifiedImageError: 
-                 QMessageBox.critical(self, "Ошибка", f"Не удалось распознать формат файла: {file_path}")
-            except Exception as e: 
-                QMessageBox.critical(self, "Ошибка открытия", f"Ошибка при открытии файла '{file_path}': {e}")
-            finally: 
-                self._update_actions_enabled_state() 
+            # Декодирование большого файла не должно блокировать интерфейс - выполняем его в пуле потоков
+            loader = _ImageLoader(file_path)
+            loader.signals.loaded.connect(self._on_image_loaded)
+            loader.signals.failed.connect(self._on_image_load_failed)
+            self._image_loaders.add(loader.signals)
+            QThreadPool.globalInstance().start(loader)
+            self._post_status(f"Загрузка: {file_path}...")
+
+    @Slot(object, str)
+    def _on_image_loaded(self, pil_img, file_path):
+        """Добавляет загруженное в фоне изображение новым слоем (выполняется в главном потоке)."""
+        self._image_loaders.discard(self.sender())
+        try:
+            if not self.layer_manager.has_layers() or not self.layer_manager.get_active_layer():
+                self.layer_manager.clear_all_layers()
+                self.history_manager.clear_all_history()
+            
+            layer_name = os.path.basename(file_path) 
+            self.layer_manager.add_layer(image=pil_img, name=layer_name, is_original=True)
+            
+            self.refresh_layer_list()
+            if self.layer_manager.layers: 
+                self.layer_manager.set_active_layer_by_id(self.layer_manager.layers[-1].id)
+
+            self._request_composite_redraw()
+            self._post_status(f"Открыто: {file_path}")
+            self._reset_zoom()
+        except Exception as e: 
+            QMessageBox.critical(self, "Ошибка открытия", f"Ошибка при открытии файла '{file_path}': {e}")
+        finally: 
+            self._update_actions_enabled_state() 
+
+    @Slot(object, str)
+    def _on_image_load_failed(self, error, file_path):
+        """Сообщает об ошибке фоновой загрузки изображения."""
+        self._image_loaders.discard(self.sender())
+        if isinstance(error, FileNotFoundError):
+            QMessageBox.critical(self, "Ошибка", f"Файл не найден: {file_path}")
+        elif isinstance(error, UnidentifiedImageError): 
+            QMessageBox.critical(self, "Ошибка", f"Не удалось распознать формат файла: {file_path}")
+        else: 
+            QMessageBox.critical(self, "Ошибка открытия", f"Ошибка при открытии файла '{file_path}': {error}")
+        self._update_actions_enabled_state() 
 
     @Slot()
     def save_image_dialog(self):
@@ -687,7 +782,7 @@ class ImageEditorWindow(QMainWindow):
         if file_path:
             try:
                 image_operations.save_image(composite_image, file_path) 
-                self.statusBar().showMessage(f"Композиция сохранена в: {file_path}")
+                self._post_status(f"Композиция сохранена в: {file_path}")
             except Exception as e:
                 QMessageBox.critical(self, "Ошибка сохранения", f"Не удалось сохранить: {e}")
 
@@ -707,62 +802,79 @@ class ImageEditorWindow(QMainWindow):
 
         self.layer_manager.clear_all_layers() 
         self.history_manager.clear_all_history()
+        self._composite_redraw_timer.stop()  # Запланированная перерисовка заменила бы заглушку ниже
+        self._pending_dirty_bbox = None
 
-        if self.drawing_canvas:
-            self.drawing_canvas.hide()
-            self.drawing_canvas.deleteLater() 
-            self.drawing_canvas = None 
+        self._hide_drawing_canvas()
         self.is_drawing_active = False
         self._reset_drawing_tool_actions_check_state() 
 
-        self.image_label.clear() 
-        self.image_label.setText("Создайте или откройте изображение (Ctrl+O или Ctrl+N)")
-        self.image_label.adjustSize() 
+        self._show_placeholder("Создайте или откройте изображение (Ctrl+O или Ctrl+N)")
 
         self.current_pixmap_for_zoom = None
-        self.current_zoom_factor = 1.0
+        self._reset_zoom()
+        self._composite_version = None
 
         self.refresh_layer_list() 
         self._update_actions_enabled_state() 
-        self.statusBar().showMessage("Все закрыто. Готово к новой работе!")
+        self._post_status("Все закрыто. Готово к новой работе!")
         return True 
 
-    def update_composite_image_display(self):
+    def _request_composite_redraw(self, dirty_bbox=None):
+        """
+        Планирует перерисовку композиции по возвращении в цикл событий.
+
+        Все запросы до этого момента выполняются одной пересборкой; их измененные области
+        объединяются, а запрос без области означает полную пересборку.
+
+        Args:
+            dirty_bbox (tuple, optional): Измененная область (left, upper, right, lower).
+        """
+        if not self._composite_redraw_timer.isActive():
+            self._pending_dirty_bbox = dirty_bbox
+            self._composite_redraw_timer.start()
+        elif self._pending_dirty_bbox is not None and dirty_bbox is not None:
+            pending = self._pending_dirty_bbox
+            self._pending_dirty_bbox = (min(pending[0], dirty_bbox[0]), min(pending[1], dirty_bbox[1]),
+                                        max(pending[2], dirty_bbox[2]), max(pending[3], dirty_bbox[3]))
+        else:
+            self._pending_dirty_bbox = None
+
+    @Slot()
+    def _do_composite_redraw(self):
+        """Выполняет перерисовку, запланированную _request_composite_redraw."""
+        dirty_bbox, self._pending_dirty_bbox = self._pending_dirty_bbox, None
+        self.update_composite_image_display(dirty_bbox=dirty_bbox)
+
+    def update_composite_image_display(self, dirty_bbox=None):
         """
-        Обновляет отображаемое изображение в QLabel (self.image_label).
+        Обновляет отображаемую композицию (элемент сцены self._pix_item).
+
+        Args:
+            dirty_bbox (tuple, optional): Измененная область (left, upper, right, lower);
+                если задана, композиция пересобирается только в ней.
         """
-        composite_image_pil = self.layer_manager.get_composite_image()
+        composite_image_pil = self.layer_manager.get_composite_image(dirty_bbox=dirty_bbox)
 
         if composite_image_pil:
             try:
-                q_image = ImageQt.ImageQt(composite_image_pil.convert("RGBA")) 
-                self.current_pixmap_for_zoom = QPixmap.fromImage(q_image) 
-                
-                if abs(self.current_zoom_factor - 1.0) > 1e-5: 
-                    scaled_width = int(self.current_pixmap_for_zoom.width() * self.current_zoom_factor)
-                    scaled_height = int(self.current_pixmap_for_zoom.height() * self.current_zoom_factor)
-                    if scaled_width > 0 and scaled_height > 0:
-                         scaled_pixmap = self.current_pixmap_for_zoom.scaled(
-                             scaled_width, scaled_height,
-                             Qt.AspectRatioMode.KeepAspectRatio,
-                             Qt.TransformationMode.SmoothTransformation)
-                         self.image_label.setPixmap(scaled_pixmap)
-                    else: 
-                         self.image_label.setPixmap(self.current_pixmap_for_zoom)
-                else: 
-                    self.image_label.setPixmap(self.current_pixmap_for_zoom)
-
-                self.image_label.adjustSize() 
+                composite_version = self.layer_manager.composite_revision
+                if self.current_pixmap_for_zoom is None or composite_version != self._composite_version:
+                    # Базовый pixmap пересоздается только при реальном изменении композиции
+                    self.current_pixmap_for_zoom = pil_to_qpixmap(composite_image_pil) 
+                    self._composite_version = composite_version
+
+                # Масштаб уже задан преобразованием вида - pixmap всегда в исходном размере
+                self._show_pixmap(self.current_pixmap_for_zoom)
             except Exception as e:
                 QMessageBox.critical(self, "Ошибка отображения", f"Не удалось отобразить композицию: {e}")
-                self.image_label.setText("Ошибка отображения композиции")
+                self._show_placeholder("Ошибка отображения композиции")
                 self.current_pixmap_for_zoom = None
         else: 
-            self.image_label.clear()
-            self.image_label.setText("Создайте или откройте изображение")
+            self._show_placeholder("Создайте или откройте изображение")
             self.current_pixmap_for_zoom = None
-            self.image_label.adjustSize()
 
+        self._update_layer_thumbnails()
         self._update_actions_enabled_state() 
 
 
@@ -785,30 +897,25 @@ class ImageEditorWindow(QMainWindow):
             elif reply == QMessageBox.StandardButton.Cancel:
                 return 
             elif reply == QMessageBox.StandardButton.Discard: 
-                if self.drawing_canvas: 
-                    self.drawing_canvas.clear_canvas() 
-                    self.drawing_canvas.hide()
-                    self.drawing_canvas.deleteLater()
-                    self.drawing_canvas = None
+                self._hide_drawing_canvas()
                 self.is_drawing_active = False 
                 self._reset_drawing_tool_actions_check_state() 
         
         try:
-            self.history_manager.add_state(active_layer.id, active_layer.image.copy()) 
-            processed_image = filter_function(active_layer.image.copy(), *args) 
+            # Фильтры не меняют входное изображение, а возвращают новое - копия для них не нужна
+            processed_image = filter_function(active_layer.image, *args) 
             
             if processed_image:
+                dirty_bbox = image_operations.get_changed_bbox(active_layer.image, processed_image)
+                self.history_manager.add_change(active_layer.id, active_layer.image, processed_image,
+                                                bbox=dirty_bbox, bbox_known=True)
                 active_layer.image = processed_image 
-                self.update_composite_image_display() 
-                self.statusBar().showMessage(f"Применен '{filter_name}' к слою '{active_layer.name}'")
+                self._request_composite_redraw(dirty_bbox=dirty_bbox) 
+                self._post_status(f"Применен '{filter_name}' к слою '{active_layer.name}'")
             else:
                 QMessageBox.warning(self, "Ошибка фильтра", f"Фильтр '{filter_name}' не вернул изображение.")
-                if self.history_manager.can_undo(active_layer.id):
-                    self.history_manager.undo(active_layer.id)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка фильтра", f"Не удалось применить '{filter_name}': {e}")
-            if self.history_manager.can_undo(active_layer.id):
-                self.history_manager.undo(active_layer.id)
         
         self._update_actions_enabled_state()
 
@@ -847,14 +954,12 @@ class ImageEditorWindow(QMainWindow):
         """Сбрасывает активный слой к его исходному состоянию."""
         active_layer = self.layer_manager.get_active_layer()
         if active_layer and active_layer.original_image:
-            self.history_manager.add_state(active_layer.id, active_layer.image.copy()) 
-            active_layer.image = active_layer.original_image.copy() 
+            active_layer.image = active_layer.original_image  # Без копии: изображения слоев не изменяются на месте
             
             self.history_manager.clear_history_for_layer(active_layer.id)
-            self.history_manager.add_state(active_layer.id, active_layer.image.copy(), is_initial_state=True)
             
-            self.update_composite_image_display()
-            self.statusBar().showMessage(f"Слой '{active_layer.name}' сброшен к оригиналу.")
+            self._request_composite_redraw()
+            self._post_status(f"Слой '{active_layer.name}' сброшен к оригиналу.")
         elif active_layer:
             QMessageBox.information(self, "Информация", f"Для слоя '{active_layer.name}' нет исходного состояния для сброса.")
         else:
@@ -862,35 +967,67 @@ class ImageEditorWindow(QMainWindow):
         self._update_actions_enabled_state()
 
     def refresh_layer_list(self):
-        """Обновляет список слоев в QListWidget."""
-        self.layer_list_widget.blockSignals(True) 
-        self.layer_list_widget.clear() 
-        
+        """
+        Приводит список слоев в QListWidget к стеку слоев.
+
+        Элементы сопоставляются со слоями по ID: удаляются только элементы исчезнувших слоев,
+        создаются - только для новых, а у остальных меняются лишь изменившиеся текст, миниатюра и позиция.
+        """
+        self.layer_list_widget.blockSignals(True)
+
         active_layer_obj = self.layer_manager.get_active_layer()
         active_layer_id = active_layer_obj.id if active_layer_obj else None
-        
-        for i, layer in enumerate(reversed(self.layer_manager.layers)): 
-            item_text = f"{layer.name} {'(V)' if layer.visible else '(H)'}" 
-            list_item = QListWidgetItem(item_text) 
-            list_item.setData(Qt.ItemDataRole.UserRole, layer.id) 
-            self.layer_list_widget.addItem(list_item) 
-            if layer.id == active_layer_id: 
-                self.layer_list_widget.setCurrentItem(list_item) 
-        
-        self.layer_list_widget.blockSignals(False) 
+
+        layers = self.layer_manager.layers
+        layer_ids = {layer.id for layer in layers}
+        for layer_id in [layer_id for layer_id in self._list_items_by_id if layer_id not in layer_ids]:
+            list_item = self._list_items_by_id.pop(layer_id)
+            self.layer_list_widget.takeItem(self.layer_list_widget.row(list_item))
+
+        user_role = Qt.ItemDataRole.UserRole
+        top_index = len(layers) - 1
+        for row in range(len(layers)):  # Верхний слой (последний в стеке) - первый в списке
+            layer = layers[top_index - row]
+            text = f"{layer.name} {'(V)' if layer.visible else '(H)'}"
+            list_item = self._list_items_by_id.get(layer.id)
+            if list_item is None:
+                list_item = QListWidgetItem(text)
+                list_item.setData(user_role, layer.id)
+                list_item.setIcon(self._layer_thumbnail_icon(layer))
+                self.layer_list_widget.insertItem(row, list_item)
+                self._list_items_by_id[layer.id] = list_item
+                continue
+            current_row = self.layer_list_widget.row(list_item)
+            if current_row != row:  # Слои переставлены
+                self.layer_list_widget.insertItem(row, self.layer_list_widget.takeItem(current_row))
+            if list_item.text() != text:
+                list_item.setText(text)
+            if layer.thumbnail_outdated:
+                list_item.setIcon(self._layer_thumbnail_icon(layer))
+
+        self.layer_list_widget.setCurrentItem(self._list_items_by_id.get(active_layer_id))
+        self.layer_list_widget.blockSignals(False)
+
+    def _layer_thumbnail_icon(self, layer):
+        """Возвращает значок панели слоев с кэшированной миниатюрой слоя."""
+        thumbnail = layer.get_thumbnail()
+        return QIcon(thumbnail) if thumbnail is not None else QIcon()
+
+    def _update_layer_thumbnails(self):
+        """Обновляет в панели слоев миниатюры тех слоев, содержимое которых изменилось."""
+        for layer in self.layer_manager.layers:
+            if layer.thumbnail_outdated:
+                list_item = self._list_items_by_id.get(layer.id)
+                if list_item is not None:
+                    list_item.setIcon(self._layer_thumbnail_icon(layer))
 
     @Slot(QListWidgetItem, QListWidgetItem) 
     def on_layer_selection_changed_in_listwidget(self, current_item: QListWidgetItem, previous_item: QListWidgetItem):
         """
         Слот, вызываемый при изменении выбора слоя в QListWidget.
         """
-        if self.is_drawing_active and self.drawing_canvas:
-            if not self.drawing_canvas.image.isNull(): 
-                pass 
-            
-            self.drawing_canvas.hide()
-            self.drawing_canvas.deleteLater()
-            self.drawing_canvas = None
+        if self.is_drawing_active:
+            self._hide_drawing_canvas()
         self.is_drawing_active = False
         self._reset_drawing_tool_actions_check_state()
 
@@ -916,24 +1053,20 @@ class ImageEditorWindow(QMainWindow):
             if current_list_widget_item: 
                 self.layer_list_widget.setCurrentItem(None) 
         elif layer_id_obj != current_list_widget_selected_id: 
-            found_in_list = False
-            for i in range(self.layer_list_widget.count()):
-                item = self.layer_list_widget.item(i)
-                if item.data(Qt.ItemDataRole.UserRole) == layer_id_obj:
-                    self.layer_list_widget.setCurrentItem(item) 
-                    found_in_list = True
-                    break
-            if not found_in_list and current_list_widget_item : 
+            item = self._list_items_by_id.get(layer_id_obj)  # Поиск по словарю вместо обхода списка
+            if item is not None:
+                self.layer_list_widget.setCurrentItem(item) 
+            elif current_list_widget_item : 
                  self.layer_list_widget.setCurrentItem(None) 
         self.layer_list_widget.blockSignals(False) 
         
         active_layer_from_manager = self.layer_manager.get_active_layer()
         if active_layer_from_manager:
-            self.statusBar().showMessage(f"Активный слой: {active_layer_from_manager.name}")
+            self._post_status(f"Активный слой: {active_layer_from_manager.name}")
         else:
-            self.statusBar().showMessage("Нет активного слоя.")
+            self._post_status("Нет активного слоя.")
         
-        self.update_composite_image_display() 
+        self._request_composite_redraw() 
 
 
     @Slot()
@@ -956,24 +1089,25 @@ class ImageEditorWindow(QMainWindow):
         if new_layer:
              if not self.layer_manager.get_active_layer() or self.layer_manager.get_active_layer().id != new_layer.id:
                  self.layer_manager.set_active_layer_by_id(new_layer.id)
-             self.statusBar().showMessage(f"Добавлен новый слой: {new_layer.name}")
+             self._post_status(f"Добавлен новый слой: {new_layer.name}")
         else:
-            self.statusBar().showMessage("Ошибка при добавлении нового слоя.")
+            self._post_status("Ошибка при добавлении нового слоя.")
         
     @Slot()
     def trigger_undo(self):
         """Отменяет последнее действие для активного слоя."""
         active_layer = self.layer_manager.get_active_layer()
         if active_layer and self.history_manager.can_undo(active_layer.id):
-            undone_image = self.history_manager.undo(active_layer.id)
+            # Запись истории сама знает измененную область - сравнивать изображения не нужно
+            undone_image, dirty_bbox = self.history_manager.undo(active_layer.id, active_layer.image)
             if undone_image:
                 active_layer.image = undone_image
-                self.update_composite_image_display()
-                self.statusBar().showMessage(f"Отменено действие для слоя '{active_layer.name}'")
+                self._request_composite_redraw(dirty_bbox=dirty_bbox)
+                self._post_status(f"Отменено действие для слоя '{active_layer.name}'")
             else: 
-                self.statusBar().showMessage(f"Не удалось отменить действие для слоя '{active_layer.name}'")
+                self._post_status(f"Не удалось отменить действие для слоя '{active_layer.name}'")
         else:
-            self.statusBar().showMessage("Больше нет действий для отмены на активном слое.")
+            self._post_status("Больше нет действий для отмены на активном слое.")
         self._update_actions_enabled_state() 
 
     @Slot()
@@ -981,15 +1115,15 @@ class ImageEditorWindow(QMainWindow):
         """Повторяет отмененное действие для активного слоя."""
         active_layer = self.layer_manager.get_active_layer()
         if active_layer and self.history_manager.can_redo(active_layer.id):
-            redone_image = self.history_manager.redo(active_layer.id)
+            redone_image, dirty_bbox = self.history_manager.redo(active_layer.id, active_layer.image)
             if redone_image:
                 active_layer.image = redone_image
-                self.update_composite_image_display()
-                self.statusBar().showMessage(f"Повторено действие для слоя '{active_layer.name}'")
+                self._request_composite_redraw(dirty_bbox=dirty_bbox)
+                self._post_status(f"Повторено действие для слоя '{active_layer.name}'")
             else: 
-                self.statusBar().showMessage(f"Не удалось повторить действие для слоя '{active_layer.name}'")
+                self._post_status(f"Не удалось повторить действие для слоя '{active_layer.name}'")
         else:
-            self.statusBar().showMessage("Больше нет действий для повтора на активном слое.")
+            self._post_status("Больше нет действий для повтора на активном слое.")
         self._update_actions_enabled_state() 
 
     @Slot()
@@ -998,45 +1132,58 @@ class ImageEditorWindow(QMainWindow):
         Изменяет масштаб отображения текущей композиции.
         """
         if not (self.current_pixmap_for_zoom and not self.current_pixmap_for_zoom.isNull()):
-            self.statusBar().showMessage("Нет изображения для масштабирования.")
+            self._post_status("Нет изображения для масштабирования.")
             return
             
         new_zoom_factor = self.current_zoom_factor * factor
         new_zoom_factor = max(0.05, min(new_zoom_factor, 20.0)) 
 
         if abs(new_zoom_factor - self.current_zoom_factor) < 1e-5 and factor != 1.0 : 
-             self.statusBar().showMessage(f"Масштаб: {self.current_zoom_factor:.2f}x (достигнут предел)")
+             self._post_status(f"Масштаб: {self.current_zoom_factor:.2f}x (достигнут предел)")
              return
 
         self.current_zoom_factor = new_zoom_factor
-        original_composite_pixmap = self.current_pixmap_for_zoom 
-        
-        new_width = int(original_composite_pixmap.width() * self.current_zoom_factor)
-        new_height = int(original_composite_pixmap.height() * self.current_zoom_factor)
-
-        if new_width > 0 and new_height > 0:
-            scaled_pixmap = original_composite_pixmap.scaled(
-                new_width, new_height, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
-            )
-            self.image_label.setPixmap(scaled_pixmap)
-            self.image_label.adjustSize() 
-            self.statusBar().showMessage(f"Масштаб: {self.current_zoom_factor:.2f}x")
-        else: 
-            self.image_label.setPixmap(original_composite_pixmap)
-            self.image_label.adjustSize()
-            self.current_zoom_factor = 1.0 
-            self.statusBar().showMessage(f"Масштаб сброшен до 1.00x (ошибка масштабирования)")
-        
+        # Масштаб - преобразование вида: композиция и холст рисования масштабируются вместе, без копий pixmap.
+        # Пока масштаб меняется, pixmap рисуется без сглаживания, сглаживание вернется после паузы.
+        self._pix_item.setTransformationMode(Qt.TransformationMode.FastTransformation)
+        self._view.setTransform(QTransform.fromScale(self.current_zoom_factor, self.current_zoom_factor))
+        self._smooth_zoom_timer.start()
+        self._post_status(f"Масштаб: {self.current_zoom_factor:.2f}x")
+
+    def _show_pixmap(self, pixmap):
+        """Показывает pixmap композиции в сцене, пропуская повторную установку того же самого pixmap."""
+        self._placeholder_item.hide()
+        if self._pix_item.pixmap().cacheKey() != pixmap.cacheKey():
+            self._pix_item.setPixmap(pixmap)
+            self._scene.setSceneRect(self._pix_item.boundingRect())
+        self._pix_item.show()
+
+    def _show_placeholder(self, text):
+        """Убирает композицию из сцены и показывает вместо нее текст-подсказку."""
+        self._pix_item.hide()
+        self._pix_item.setPixmap(QPixmap())
+        self._placeholder_item.setPlainText(text)
+        self._placeholder_item.show()
+        self._scene.setSceneRect(self._placeholder_item.boundingRect())
+
     @Slot()
+    def _refine_zoom(self):
+        """Возвращает сглаживание композиции после быстрого предпросмотра масштаба."""
+        self._pix_item.setTransformationMode(Qt.TransformationMode.SmoothTransformation)
+
+    @Slot()
+    def _reset_zoom(self):
+        """Возвращает масштаб 1.0: и множитель масштаба, и преобразование вида, которое его задает."""
+        self.current_zoom_factor = 1.0
+        self._view.setTransform(QTransform())
+
     def set_actual_image_size(self):
         """Устанавливает масштаб отображения в 100% (реальный размер)."""
         if self.current_pixmap_for_zoom and not self.current_pixmap_for_zoom.isNull(): 
-            self.image_label.setPixmap(self.current_pixmap_for_zoom) 
-            self.image_label.adjustSize()
-            self.current_zoom_factor = 1.0
-            self.statusBar().showMessage("Масштаб: 1.00x (Реальный размер)")
+            self._reset_zoom()
+            self._post_status("Масштаб: 1.00x (Реальный размер)")
         else:
-            self.statusBar().showMessage("Нет изображения для отображения в реальном размере.")
+            self._post_status("Нет изображения для отображения в реальном размере.")
 
     def _update_actions_enabled_state(self):
         """Обновляет состояние (enabled/disabled) всех QAction."""
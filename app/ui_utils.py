@@ -1,6 +1,7 @@
 # Файл: app/ui_utils.py
 # (Без изменений в этой версии, но оставлен для будущих утилит)
-from PySide6.QtGui import QAction, QIcon
+from PIL import Image
+from PySide6.QtGui import QAction, QIcon, QImage, QPixmap
 
 def create_action(parent, text, slot=None, shortcut=None, icon_path=None, tip=None):
     action = QAction(text, parent)
@@ -10,4 +11,44 @@ def create_action(parent, text, slot=None, shortcut=None, icon_path=None, tip=No
     if tip:
         action.setToolTip(tip)
         action.setStatusTip(tip)
-    return action
\ No newline at end of file
+    return action
+
+
+def pil_to_qpixmap(image_pil):
+    """
+    Преобразует PIL Image в QPixmap напрямую из сырых RGBA-байтов.
+
+    В отличие от ImageQt.ImageQt, данные копируются одним memcpy без построчной
+    конвертации на стороне Python.
+
+    Все QPixmap в приложении создаются через QPixmap.fromImage (а не конструктор
+    QPixmap(QImage), который в привязках заметно медленнее) - используйте эту функцию.
+    """
+    if image_pil.mode == "RGB":
+        # Без альфа-канала: 3 байта на пиксель и никакого домножения на альфу
+        raw_bytes = image_pil.tobytes("raw", "RGB")
+        q_image = QImage(raw_bytes, image_pil.width, image_pil.height, image_pil.width * 3,
+                         QImage.Format.Format_RGB888)
+        return QPixmap.fromImage(q_image)
+
+    if image_pil.mode != "RGBA":
+        image_pil = image_pil.convert("RGBA")
+    raw_bytes = image_pil.tobytes("raw", "RGBA")
+    q_image = QImage(raw_bytes, image_pil.width, image_pil.height, image_pil.width * 4,
+                     QImage.Format.Format_RGBA8888)
+    # QPixmap.fromImage копирует пиксели, поэтому raw_bytes должен жить только до этого вызова.
+    # При копировании Qt сам переводит их в ARGB32_Premultiplied (один SIMD-проход, 4K - ~20 мс):
+    # отрисовка pixmap при масштабировании и прокрутке - простой blit без домножения на альфу
+    return QPixmap.fromImage(q_image)
+
+
+def qimage_to_pil(q_image):
+    """
+    Преобразует QImage в PIL Image (RGBA) через прямой доступ к пикселям.
+
+    ImageQt.fromqimage кодирует изображение в PNG и декодирует обратно; здесь Qt сам
+    переводит пиксели в непремультиплицированный RGBA, а PIL копирует буфер целиком.
+    """
+    rgba_image = q_image.convertToFormat(QImage.Format.Format_RGBA8888)
+    return Image.frombytes("RGBA", (rgba_image.width(), rgba_image.height()), rgba_image.constBits(),
+                           "raw", "RGBA", rgba_image.bytesPerLine())
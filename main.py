@@ -4,12 +4,29 @@
 import sys
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QFont
-from PySide6.QtCore import QFile, QTextStream, QDir
+from PySide6.QtCore import QDir
 from app.main_window import ImageEditorWindow
 import os
+from pathlib import Path
+import PIL
+
+# Pillow-SIMD ставится вместо Pillow (pip uninstall pillow && pip install pillow-simd) и ускоряет
+# сведение слоев, масштабирование и свертки в libImaging за счет SSE4/AVX2. Ее версии имеют
+# суффикс .postN (например, 9.0.0.post1)
+PILLOW_SIMD_HINT = "pip uninstall pillow && pip install pillow-simd"
+
+
+def check_pillow_simd():
+    """Сообщает при запуске, используется ли Pillow-SIMD, и как ее установить, если нет."""
+    if 'post' in PIL.__version__:
+        print(f"Используется Pillow-SIMD {PIL.__version__}")
+    else:
+        print(f"Используется Pillow {PIL.__version__}. Для ускорения обработки изображений "
+              f"можно установить Pillow-SIMD: {PILLOW_SIMD_HINT}")
 
 
 def main():
+    check_pillow_simd()
     app = QApplication(sys.argv)
 
     # Установка путей для ресурсов (иконки, стили)
@@ -28,25 +45,18 @@ def main():
     # Хотя в нашем style.qss пока нет url(), это хорошая практика.
     QDir.setCurrent(resources_path)
 
-    # Загрузка стилей QSS
+    # Загрузка стилей QSS: файл читается один раз, запасной путь проверяется, только если основного нет
+    fallback_styles_path = "resources/styles/style.qss"
     try:
-        style_file = QFile(styles_path)  # Используем абсолютный путь
-        if style_file.open(QFile.ReadOnly | QFile.Text):
-            stream = QTextStream(style_file)
-            app.setStyleSheet(stream.readAll())
-            style_file.close()
+        if os.path.exists(styles_path):
+            app.setStyleSheet(Path(styles_path).read_text(encoding="utf-8"))
             print(f"Стили успешно загружены из: {styles_path}")
+        elif os.path.exists(fallback_styles_path):
+            # Относительный путь как запасной вариант, если структура другая
+            app.setStyleSheet(Path(fallback_styles_path).read_text(encoding="utf-8"))
+            print("Стили успешно загружены по относительному пути (запасной вариант).")
         else:
-            print(f"Не удалось открыть файл стилей: {styles_path}, ошибка: {style_file.errorString()}")
-            # Попробуем относительный путь как запасной вариант, если структура другая
-            style_file_rel = QFile("resources/styles/style.qss")
-            if style_file_rel.open(QFile.ReadOnly | QFile.Text):
-                stream_rel = QTextStream(style_file_rel)
-                app.setStyleSheet(stream_rel.readAll())
-                style_file_rel.close()
-                print("Стили успешно загружены по относительному пути (запасной вариант).")
-            else:
-                print("Не удалось загрузить файл стилей и по относительному пути.")
+            print(f"Файл стилей не найден: {styles_path}")
 
     except Exception as e:
         print(f"Ошибка при загрузке стилей: {e}")